@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from app.core.config import Config
+
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto"
+)
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    """
+    Runs argon2 hashing and verification in a process pool so the event loop
+    keeps serving other requests while a hash is being computed.
+
+    At most `queue_size` operations may be running or waiting for a worker;
+    beyond that callers get a 503 instead of piling up behind the pool.
+
+    A pool broken by a dead worker is replaced and the operation retried
+    once on the new pool; if that fails too the caller gets a 503.
+    """
+
+    def __init__(self, max_workers: int, queue_size: int):
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # workers must not be forked from the running event loop: a fork
+            # would copy its threads' locks and the open Mongo/Redis sockets
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context(method)
+            )
+        return self._executor
+
+    async def _run(self, fn, *args):
+        if self._pending >= self.queue_size:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please retry",
+                headers={"Retry-After": "1"},
+            )
+        self._pending += 1
+        try:
+            try:
+                return await self._submit(fn, *args)
+            except BrokenProcessPool as exc:
+                logging.error(f"password hashing pool broke, starting a new one: {exc}")
+            try:
+                return await self._submit(fn, *args)
+            except BrokenProcessPool as exc:
+                logging.error(f"password hashing pool broke again: {exc}")
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Password hashing is unavailable, please retry",
+                    headers={"Retry-After": "1"},
+                )
+        finally:
+            self._pending -= 1
+
+    async def _submit(self, fn, *args):
+        executor = self._get_executor()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            # concurrent callers all see the same broken pool; replace it once
+            if self._executor is executor:
+                self._executor = None
+                executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(_verify, plain_password, hashed_password)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    max_workers=Config.PASSWORD_HASH_WORKERS,
+    queue_size=Config.PASSWORD_HASH_QUEUE_SIZE,
+)
@@ -0,0 +1,150 @@
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from pymongo.errors import DuplicateKeyError
+
+from app.core.bloom import BloomFilter
+from app.core.config import Config
+from app.database.asyncdb.models import revoked_tokens_db
+
+
+class RevocationList:
+    """
+    Revoked token ids (`jti`), stored in the RevokedTokens collection until
+    the token's own `exp` (a TTL index removes them) and mirrored in an
+    in-memory Bloom filter. A token the filter has never seen is not
+    revoked, so the common case costs a few hashes and no database call;
+    only filter hits, revoked or false positive, are confirmed in Mongo.
+
+    Revocations made in this process go into the filter immediately. Those
+    made by other processes are pulled every `sync_interval` seconds, and
+    every `rebuild_interval` the filter is rebuilt from the collection to
+    drop expired ids.
+    """
+
+    def __init__(self, capacity: int, error_rate: float, sync_interval: float, rebuild_interval: float):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.sync_interval = sync_interval
+        self.rebuild_interval = rebuild_interval
+        self.bloom = BloomFilter(capacity, error_rate)
+        self.lookups = 0
+        self.false_positives = 0
+        self._synced_at: Optional[datetime] = None
+        self._rebuilt_at = 0.0
+        self._runner: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _utcnow() -> datetime:
+        return datetime.now(timezone.utc)
+
+    @staticmethod
+    def _document(jti: str, exp: int) -> dict:
+        return {
+            "_id": jti,
+            "exp": datetime.fromtimestamp(exp, tz=timezone.utc),
+            "revoked_at": RevocationList._utcnow(),
+        }
+
+    async def revoke(self, jti: str, exp: int):
+        """Revokes a token id until `exp` (epoch seconds); revoking twice is a no-op."""
+        document = self._document(jti, exp)
+        del document["_id"]
+        await revoked_tokens_db.update_one({"_id": jti}, {"$setOnInsert": document}, upsert=True)
+        if jti not in self.bloom:
+            self.bloom.add(jti)
+
+    async def revoke_once(self, jti: str, exp: int) -> bool:
+        """
+        Revokes a token id, returning False if it was already revoked. The
+        insert is the atomic check, so of two concurrent calls only one wins.
+        """
+        try:
+            await revoked_tokens_db.insert_one(data=self._document(jti, exp))
+        except DuplicateKeyError:
+            return False
+        self.bloom.add(jti)
+        return True
+
+    async def is_revoked(self, jti: Optional[str]) -> bool:
+        if not jti or jti not in self.bloom:
+            return False
+        self.lookups += 1
+        revoked = await revoked_tokens_db.find_one({"_id": jti}, projection={"_id": 1}) is not None
+        if not revoked:
+            self.false_positives += 1
+        return revoked
+
+    async def rebuild(self):
+        """Replaces the filter with one holding every unexpired revocation."""
+        started_at = self._utcnow()
+        jtis = {doc["_id"] async for doc in revoked_tokens_db.iter_find({"exp": {"$gt": started_at}}, projection={"_id": 1})}
+        # ids revoked while the query ran went into the old filter and must not be lost
+        jtis.update(await self._revoked_since(started_at))
+        bloom = BloomFilter(max(self.capacity, 2 * len(jtis)), self.error_rate)
+        for jti in jtis:
+            bloom.add(jti)
+        self.bloom = bloom
+        self._synced_at = started_at
+        self._rebuilt_at = time.monotonic()
+
+    @staticmethod
+    async def _revoked_since(since: datetime) -> set:
+        # a second of overlap covers clock skew between app servers
+        query = {"revoked_at": {"$gte": since - timedelta(seconds=1)}}
+        return {doc["_id"] async for doc in revoked_tokens_db.iter_find(query, projection={"_id": 1})}
+
+    async def sync(self):
+        """Adds revocations made since the last sync, by any process."""
+        started_at = self._utcnow()
+        for jti in await self._revoked_since(self._synced_at):
+            if jti not in self.bloom:
+                self.bloom.add(jti)
+        self._synced_at = started_at
+
+    async def start(self):
+        # the filter must be complete before the first request is authenticated
+        await self.rebuild()
+        if self._runner is None:
+            self._runner = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._runner is not None:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                if time.monotonic() - self._rebuilt_at >= self.rebuild_interval:
+                    await self.rebuild()
+                else:
+                    await self.sync()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logging.error(f"error refreshing token revocation filter: {exc}")
+
+    def stats(self) -> dict:
+        return {
+            "revoked_ids": self.bloom.count,
+            "bloom_bits": self.bloom.size,
+            "lookups": self.lookups,
+            "false_positives": self.false_positives,
+        }
+
+
+revocation_list = RevocationList(
+    capacity=Config.REVOCATION_BLOOM_CAPACITY,
+    error_rate=Config.REVOCATION_BLOOM_ERROR_RATE,
+    sync_interval=Config.REVOCATION_SYNC_INTERVAL_SECONDS,
+    rebuild_interval=Config.REVOCATION_REBUILD_INTERVAL_SECONDS,
+)
@@ -1,21 +1,28 @@
 from email_validator import EmailNotValidError
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Response
 from datetime import datetime, timedelta, timezone
 import logging
+from typing import Optional
 
 from fastapi.security import OAuth2PasswordRequestForm, HTTPAuthorizationCredentials
+from jose import JWTError, jwt
 from email_validator import validate_email
+from pymongo.errors import DuplicateKeyError
 
-from app.auth.schemas import RegisterRequest, TokenResponse, UserResponse
+from app.auth.revocation import revocation_list
+from app.auth.schemas import LogoutRequest, RefreshRequest, RegisterRequest, TokenResponse, UserResponse
 from app.auth.service import AuthService
-from app.core.dependencies import get_current_user
+from app.core.dependencies import get_current_user, security, token_cache
+from app.core.rate_limit import login_rate_limit, refresh_rate_limit, register_rate_limit
+from app.core.security import JWT_ALGORITHM, JWT_SECRET_KEY
 
 router = APIRouter()
 
 @router.post(
     "/register", 
     status_code=status.HTTP_201_CREATED,
-    responses={409: {"description": "User already exists"}}
+    responses={409: {"description": "User already exists"}},
+    dependencies=[Depends(register_rate_limit.by_ip)],
 )
 async def register_user(payload: RegisterRequest):
     """
@@ -30,6 +37,7 @@ async def register_user(payload: RegisterRequest):
 
     Raises:
         HTTPException: 409 Conflict if the email already exists.
+        HTTPException: 503 Service Unavailable if password hashing is overloaded or unavailable.
         HTTPException: 500 Internal Server Error for unexpected server-side errors.
 
     Returns:
@@ -52,14 +60,20 @@ async def register_user(payload: RegisterRequest):
         
         doc = {
             "email": payload.email,
-            "password": AuthService.hash_password(payload.password),
+            "password": await AuthService.hash_password_async(payload.password),
             "name": payload.name,
             "role": payload.role,
             "created_at": now,
         }
 
-        # 3. Database Insertion
-        await AuthService.user_insertion(doc)
+        # 3. Database Insertion (the unique email index catches concurrent registrations)
+        try:
+            await AuthService.user_insertion(doc)
+        except DuplicateKeyError:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Email already exists"
+            )
 
         return {"message": "User successfully created"}
 
@@ -74,7 +88,36 @@ async def register_user(payload: RegisterRequest):
         )
     
 
-@router.post("/login", response_model=TokenResponse)
+def _issue_tokens(user: dict) -> TokenResponse:
+    access = AuthService.create_access_token(
+        str(user["_id"]),
+        user["email"],
+        user["role"]
+    )
+    refresh = AuthService.create_refresh_token(
+        str(user["_id"]),
+        user["email"],
+        user["role"]
+    )
+
+    return TokenResponse(
+        access_token=access["token"],
+        refresh_token=refresh["token"],
+        expires_in=int(timedelta(minutes=10).total_seconds())
+    )
+
+
+def _decode_refresh_token(token: str) -> dict:
+    try:
+        payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    if payload.get("type") != "refresh" or not payload.get("jti"):
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    return payload
+
+
+@router.post("/login", response_model=TokenResponse, dependencies=[Depends(login_rate_limit.by_ip)])
 async def login(form: OAuth2PasswordRequestForm = Depends()):
     """
     API for user login. Validates user credentials and returns JWT tokens.
@@ -88,6 +131,7 @@ async def login(form: OAuth2PasswordRequestForm = Depends()):
         HTTPException: 400 Bad Request if the email format is invalid.
         HTTPException: 401 Unauthorized if the user does not exist.
         HTTPException: 401 Unauthorized if the password is incorrect.
+        HTTPException: 503 Service Unavailable if password hashing is overloaded or unavailable.
         HTTPException: 500 Internal Server Error for any unexpected server-side errors.
 
     Returns:
@@ -118,35 +162,104 @@ async def login(form: OAuth2PasswordRequestForm = Depends()):
                 detail="Invalid email or password"
             )
 
-        if not AuthService.verify_password(form.password, user["password"]):
+        if not await AuthService.verify_password_async(form.password, user["password"]):
             raise HTTPException(
                 status_code=401,
                 detail="Invalid email or password"
             )
 
-        # Create tokens
-        access = AuthService.create_access_token(
-            str(user["_id"]),
-            user["email"],
-            user["role"]
-        )
-        refresh = AuthService.create_refresh_token(
-            str(user["_id"]),
-            user["email"],
-            user["role"]
+        return _issue_tokens(user)
+
+    # Let FastAPI handle HTTPExceptions properly
+    except HTTPException:
+        raise
+    except Exception as exc:
+        logging.error(f"Error occurred in login API: {exc}")
+        raise HTTPException(
+            status_code=500,
+            detail="Internal server error"
         )
 
-        return TokenResponse(
-            access_token=access["token"],
-            refresh_token=refresh["token"],
-            expires_in=int(timedelta(minutes=10).total_seconds())
+
+@router.post("/refresh", response_model=TokenResponse, dependencies=[Depends(refresh_rate_limit.by_ip)])
+async def refresh_tokens(payload: RefreshRequest):
+    """
+    API to exchange a refresh token for a new access and refresh token pair.
+    The refresh token is rotated: it is revoked as it is used, so it can be
+    exchanged only once.
+
+    Args:
+        payload (RefreshRequest): Request body containing:
+            - refresh_token (str): Refresh token from login or an earlier refresh
+
+    Raises:
+        HTTPException: 401 Unauthorized if the token is invalid, expired, revoked or already used.
+        HTTPException: 401 Unauthorized if the user no longer exists.
+        HTTPException: 429 Too Many Requests if the client IP is over the refresh limit.
+        HTTPException: 500 Internal Server Error for any unexpected server-side errors.
+
+    Returns:
+        TokenResponse: A new access token and refresh token
+    """
+    try:
+        claims = _decode_refresh_token(payload.refresh_token)
+        # the insert is the atomic check, so a replayed token loses even when raced
+        if not await revocation_list.revoke_once(claims["jti"], claims["exp"]):
+            raise HTTPException(status_code=401, detail="Refresh token has been revoked")
+
+        # re-read the user so a changed role or a deleted account takes effect
+        user = await AuthService.get_user_by_id(claims["sub"])
+        if not user:
+            raise HTTPException(status_code=401, detail="User not found")
+        return _issue_tokens(user)
+
+    except HTTPException:
+        raise
+    except Exception as exc:
+        logging.error(f"Error occurred in refresh API: {exc}")
+        raise HTTPException(
+            status_code=500,
+            detail="Internal server error"
         )
 
-    # Let FastAPI handle HTTPExceptions properly
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    payload: Optional[LogoutRequest] = None,
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    current_user: dict = Depends(get_current_user),
+):
+    """
+    API to log out. Revokes the access token used for the call and, if given,
+    the refresh token, until they would have expired.
+
+    Args:
+        payload (LogoutRequest): Optional request body containing:
+            - refresh_token (str): Refresh token to revoke as well
+        current_user: The current authenticated user (extracted from JWT token)
+
+    Raises:
+        HTTPException: 401 Unauthorized if the access token is invalid or already revoked.
+        HTTPException: 401 Unauthorized if the refresh token is invalid or belongs to another user.
+        HTTPException: 500 Internal Server Error for any unexpected server-side errors.
+    """
+    try:
+        refresh = None
+        if payload is not None and payload.refresh_token:
+            refresh = _decode_refresh_token(payload.refresh_token)
+            if refresh["sub"] != current_user["sub"]:
+                raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+        await revocation_list.revoke(current_user["jti"], current_user["exp"])
+        token_cache.discard(credentials.credentials)
+        if refresh is not None:
+            await revocation_list.revoke(refresh["jti"], refresh["exp"])
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+
     except HTTPException:
         raise
     except Exception as exc:
-        logging.error(f"Error occurred in login API: {exc}")
+        logging.error(f"Error occurred in logout API: {exc}")
         raise HTTPException(
             status_code=500,
             detail="Internal server error"
@@ -35,6 +35,13 @@ class TokenResponse(BaseModel):
     token_type: str = "bearer"
     expires_in: int
 
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
+
 class UserResponse(BaseModel):
     id: str
     email: EmailStr
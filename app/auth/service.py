@@ -1,14 +1,11 @@
 import uuid
 
+from argon2.exceptions import InvalidHashError, VerifyMismatchError
 from fastapi import HTTPException,status
 from app.core.config import Config
-from app.database.asyncdb.models import Users
+from app.database.asyncdb.models import users_db
 from datetime import datetime, timedelta, timezone
-from passlib.context import CryptContext
-pwd_context = CryptContext(
-    schemes=["argon2"],
-    deprecated="auto"
-)
+from app.auth.hashing import password_hasher
 from jose import jwt
 from bson import ObjectId
 
@@ -17,26 +14,26 @@ class AuthService(object):
 
     @staticmethod
     async def user_validator(email):
-        user_exist = await Users().find_one(query={"email": email},projection={"_id":1,"email":1,"role":1,"password":1})
+        user_exist = await users_db.find_one(query={"email": email},projection={"_id":1,"email":1,"role":1,"password":1})
         return user_exist
     
     @staticmethod
     async def get_user_by_id(user_id: str):
-        user = await Users().find_one(query={"_id": ObjectId(user_id)}, projection={"password": 0})
+        user = await users_db.find_one(query={"_id": ObjectId(user_id)}, projection={"password": 0}, use_cache=True)
         return user
     
     @staticmethod
     async def user_insertion(docs):
-        await Users().insert_one(data=docs)
+        await users_db.insert_one(data=docs)
     @staticmethod
-    def hash_password(password: str) -> str:
-        return pwd_context.hash(password)
+    async def hash_password_async(password: str) -> str:
+        return await password_hasher.hash(password)
     @staticmethod
-    def verify_password(plain_password: str, hashed_password: str) -> bool:
+    async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
         try:
-            return pwd_context.verify(plain_password, hashed_password)
-        except Exception:
-            # Treat any hash/verification error as invalid credentials
+            return await password_hasher.verify(plain_password, hashed_password)
+        except (VerifyMismatchError, InvalidHashError, ValueError):
+            # a malformed stored hash is a failed login, not a server error
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid email or password"
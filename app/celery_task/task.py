@@ -1,14 +1,37 @@
-import asyncio
-import logging
+from celery.signals import worker_init, worker_process_shutdown, worker_shutdown
+from prometheus_client import start_http_server
 
-from app.database.asyncdb.models import Tasks
+from app.core.config import Config
+from app.core.metrics import track_task_update
 from app.tasks.service import TaskService
 from app.websockets.manager import manager
+from app.worker.async_runner import runner
 from app.worker.celer_worker import celery_app
 from bson import ObjectId
 
+
+@worker_init.connect
+def start_metrics_server(**kwargs):
+    # the worker has no HTTP server of its own; expose its registry on a side port
+    if Config.METRICS_ENABLED and Config.CELERY_METRICS_PORT:
+        start_http_server(Config.CELERY_METRICS_PORT)
+
+
+@worker_shutdown.connect
+@worker_process_shutdown.connect
+def stop_async_runner(**kwargs):
+    runner.stop()
+
+
 @celery_app.task(name="app.celery_task.task.task_update")
 def task_update(task_id,user_id):
     task_id = ObjectId(task_id)
-    asyncio.run(TaskService.task_update(task_id,user_id))
-    
\ No newline at end of file
+    # runs on the worker's long-lived loop; see app/worker/async_runner.py
+    with track_task_update("celery"):
+        runner.run(TaskService.task_update, task_id, user_id)
+
+
+@celery_app.task(name="app.celery_task.task.reconcile_task_stats")
+def reconcile_task_stats():
+    # offline repair of the status counters, e.g. from celery beat during quiet hours
+    return runner.run(TaskService.reconcile_stats)
@@ -1,13 +1,68 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Literal, Optional
 
 
 class Settings(BaseSettings):
     MONGO_URI: str
+    MONGO_MAX_POOL_SIZE: int = 100
+    MONGO_MIN_POOL_SIZE: int = 0
+    MONGO_MAX_IDLE_TIME_MS: Optional[int] = None
+    MONGO_WAIT_QUEUE_TIMEOUT_MS: Optional[int] = None
+    MONGO_COMPRESSORS: Optional[str] = None  # e.g. "zstd,snappy,zlib"
+    MONGO_ZLIB_COMPRESSION_LEVEL: Optional[int] = None
     JWT_SECRET_KEY: str 
     JWT_ALGORITHM: str = "HS256"
     BROKER_URL: str
     CELERY_RESULT_BACKEND: str
+    CELERY_ASYNC_CONCURRENCY: int = 100
+    TASK_COMPLETION_DELAY_SECONDS: float = 10
+    SCHEDULER_LEASE_SECONDS: float = 60
+    SCHEDULER_POLL_INTERVAL_SECONDS: float = 5
+    SCHEDULER_MAX_ATTEMPTS: int = 5
+    SCHEDULER_MAX_CONCURRENCY: int = 100
+    SCHEDULER_BATCH_SIZE: int = 500  # jobs one worker claims per tick
+    MONGO_INDEX_SELF_CHECK: bool = True
+    QUERY_CACHE_ENABLED: bool = False
+    QUERY_CACHE_SIZE: int = 10000
+    QUERY_CACHE_TTL_SECONDS: float = 30
+    QUERY_CACHE_REDIS_URL: Optional[str] = None
+    SINGLE_FLIGHT_ENABLED: bool = True  # identical concurrent reads share one query
+    TASK_INSERT_BATCHING_ENABLED: bool = False  # group-commit concurrent task creates into insert_many
+    TASK_INSERT_BATCH_WINDOW_MS: float = 2.0
+    TASK_INSERT_BATCH_SIZE: int = 100
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_QUEUE_SIZE: int = 64
+    TOKEN_CACHE_SIZE: int = 10000
+    REVOCATION_BLOOM_CAPACITY: int = 100000  # revoked ids before the false-positive rate degrades
+    REVOCATION_BLOOM_ERROR_RATE: float = 0.001
+    REVOCATION_SYNC_INTERVAL_SECONDS: float = 5.0  # how soon other processes see a revocation
+    REVOCATION_REBUILD_INTERVAL_SECONDS: float = 3600.0
+    WEBSOCKET_BROADCAST_BACKEND: Literal["memory", "redis"] = "redis"
+    WEBSOCKET_BROADCAST_URL: Optional[str] = None
+    WEBSOCKET_BROADCAST_CHANNEL: str = "websocket:broadcast"
+    WEBSOCKET_SEND_QUEUE_SIZE: int = 256
+    WEBSOCKET_BATCH_WINDOW_MS: int = 20
+    WEBSOCKET_BATCH_MAX_EVENTS: int = 100
+    TASK_CHANGE_STREAM_ENABLED: bool = False  # needs a replica set
+    METRICS_ENABLED: bool = True
+    CELERY_METRICS_PORT: Optional[int] = 9100  # worker-side /metrics server, None to disable
+    PROFILING_ENABLED: bool = True  # installs the middleware; sampling stays off until an admin turns it on
+    PROFILING_INTERVAL_MS: float = 1.0
+    PROFILING_BUFFER_SIZE: int = 50
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: Literal["memory", "redis"] = "memory"  # redis to share buckets across workers
+    RATE_LIMIT_REDIS_URL: Optional[str] = None  # defaults to BROKER_URL
+    RATE_LIMIT_MAX_KEYS: int = 100000  # in-memory buckets kept (LRU)
+    RATE_LIMIT_TRUST_FORWARDED_FOR: bool = False  # key auth routes on X-Forwarded-For behind a proxy
+    RATE_LIMIT_LOGIN_PER_MINUTE: float = 10
+    RATE_LIMIT_LOGIN_BURST: int = 5
+    RATE_LIMIT_REGISTER_PER_MINUTE: float = 5
+    RATE_LIMIT_REGISTER_BURST: int = 5
+    RATE_LIMIT_REFRESH_PER_MINUTE: float = 30
+    RATE_LIMIT_REFRESH_BURST: int = 10
+    RATE_LIMIT_TASK_WRITES_PER_MINUTE: float = 120
+    RATE_LIMIT_TASK_WRITES_BURST: int = 30
 
     class Config:
         env_file = ".env"
@@ -1,11 +1,25 @@
 from fastapi import Depends, HTTPException, Request, WebSocket, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
+from app.auth.revocation import revocation_list
+from app.core.config import Config
 from app.core.security import JWT_SECRET_KEY, JWT_ALGORITHM
+from app.core.token_cache import VerifiedTokenCache
 from app.websockets.manager import ConnectionManager
 
 
 security = HTTPBearer()
+token_cache = VerifiedTokenCache(maxsize=Config.TOKEN_CACHE_SIZE)
+
+
+async def _check_not_revoked(payload: dict):
+    # an in-memory Bloom filter lookup unless the token id may have been revoked
+    if await revocation_list.is_revoked(payload.get("jti")):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
 
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
@@ -23,6 +37,12 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
     """
     try:
         token = credentials.credentials
+        # Only verified access tokens are cached, so a hit only needs the revocation check
+        payload = token_cache.get(token)
+        if payload is not None:
+            await _check_not_revoked(payload)
+            return payload
+
         payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=[JWT_ALGORITHM])
 
         # Verify it's an access token
@@ -33,6 +53,8 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
                 headers={"WWW-Authenticate": "Bearer"},
             )
 
+        await _check_not_revoked(payload)
+        token_cache.put(token, payload)
         return payload
     except JWTError as e:
         raise HTTPException(
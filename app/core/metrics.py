@@ -0,0 +1,170 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, Tuple
+
+from prometheus_client import Counter, Histogram
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, HistogramMetricFamily
+from prometheus_client.registry import Collector
+from pymongo import monitoring
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route", "status"],
+)
+MONGO_COMMAND_LATENCY = Histogram(
+    "mongo_command_duration_seconds",
+    "MongoDB command latency as reported by the driver",
+    ["collection", "command", "outcome"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+TASK_UPDATES = Counter(
+    "task_updates_total",
+    "Delayed task completions by execution path and outcome",
+    ["path", "outcome"],
+)
+TASK_UPDATE_LATENCY = Histogram(
+    "task_update_duration_seconds",
+    "Delayed task completion latency by execution path",
+    ["path"],
+)
+RATE_LIMITED = Counter(
+    "rate_limited_total",
+    "Requests rejected by a rate limit",
+    ["limit"],
+)
+INSERT_BATCH_SIZE = Histogram(
+    "mongo_insert_batch_size",
+    "Documents per group-committed insert_many",
+    ["collection"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+SINGLE_FLIGHT_DEDUPLICATED = Counter(
+    "mongo_single_flight_deduplicated_total",
+    "Reads answered by an identical read already in flight",
+    ["collection"],
+)
+
+# histogram buckets of per-connection outbound queue depth
+QUEUE_DEPTH_BUCKETS = (0, 1, 4, 16, 64, 128, 256)
+
+
+class PrometheusMiddleware:
+    """
+    Pure ASGI middleware timing every HTTP request. Requests are labelled
+    with the matched route template rather than the raw path, so label
+    cardinality stays bounded by the number of routes.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            REQUEST_LATENCY.labels(
+                scope["method"], getattr(route, "path", "unmatched"), str(status)
+            ).observe(time.perf_counter() - started)
+
+
+class CommandMetrics(monitoring.CommandListener):
+    """
+    Feeds MONGO_COMMAND_LATENCY from pymongo command monitoring. The
+    collection is only present on the started event, so it is kept per
+    in-flight request until the command finishes.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Tuple, str] = {}
+
+    @staticmethod
+    def _key(event) -> Tuple:
+        return (event.connection_id, event.request_id)
+
+    def started(self, event):
+        target = event.command.get("collection" if event.command_name == "getMore" else event.command_name)
+        self._inflight[self._key(event)] = target if isinstance(target, str) else ""
+
+    def _observe(self, event, outcome: str):
+        collection = self._inflight.pop(self._key(event), "")
+        MONGO_COMMAND_LATENCY.labels(collection, event.command_name, outcome).observe(event.duration_micros / 1e6)
+
+    def succeeded(self, event):
+        self._observe(event, "success")
+
+    def failed(self, event):
+        self._observe(event, "failure")
+
+
+class WebSocketCollector(Collector):
+    """
+    Reads connection counts and outbound queue depths from a
+    ConnectionManager at scrape time, so the send path pays nothing.
+    """
+
+    def __init__(self, manager):
+        self.manager = manager
+
+    def collect(self):
+        depths = [
+            connection.queue.qsize()
+            for connections in list(self.manager.active_connections.values())
+            for connection in list(connections.values())
+        ]
+        yield GaugeMetricFamily("websocket_connections", "Open WebSocket connections", value=len(depths))
+        yield GaugeMetricFamily(
+            "websocket_connected_users", "Users with at least one open WebSocket",
+            value=len(self.manager.active_connections),
+        )
+        yield GaugeMetricFamily("websocket_evicted", "Slow consumers disconnected since start", value=self.manager.evicted)
+        buckets = [(str(bound), sum(1 for depth in depths if depth <= bound)) for bound in QUEUE_DEPTH_BUCKETS]
+        buckets.append(("+Inf", len(depths)))
+        yield HistogramMetricFamily(
+            "websocket_send_queue_depth", "Queued outbound events per connection",
+            buckets=buckets, sum_value=sum(depths),
+        )
+
+
+class TokenCacheCollector(Collector):
+    """Reads the verified-token cache counters at scrape time."""
+
+    def __init__(self, cache):
+        self.cache = cache
+
+    def collect(self):
+        stats = self.cache.stats()
+        yield GaugeMetricFamily("token_cache_entries", "Verified tokens held in the token cache", value=stats["size"])
+        yield CounterMetricFamily("token_cache_hits", "Token verifications answered by the cache", value=stats["hits"])
+        yield CounterMetricFamily("token_cache_misses", "Token verifications that ran jwt.decode", value=stats["misses"])
+
+
+@contextmanager
+def track_task_update(path: str):
+    """Counts and times one task completion run from `path` ("scheduler" or "celery")."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        TASK_UPDATES.labels(path, "failure").inc()
+        raise
+    else:
+        TASK_UPDATES.labels(path, "success").inc()
+    finally:
+        TASK_UPDATE_LATENCY.labels(path).observe(time.perf_counter() - started)
+
+
+command_metrics = CommandMetrics()
@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+import redis.asyncio as aioredis
+from fastapi import Depends, HTTPException, Request, status
+
+from app.core.config import Config
+from app.core.dependencies import get_current_user
+from app.core.metrics import RATE_LIMITED
+
+# Refills the bucket from the elapsed server time, takes `cost` tokens if it
+# can and returns the seconds to wait otherwise (0 when allowed). A cost above
+# the capacity is let through on a full bucket and leaves it in debt. The key
+# lives until the bucket would be full again. The result is a string because
+# Lua numbers become integers on the way out.
+_REDIS_TAKE = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local needed = math.min(cost, capacity)
+local wait = 0
+if tokens >= needed then
+    tokens = tokens - cost
+else
+    wait = (needed - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+return tostring(wait)
+"""
+
+
+class TokenBucketBackend(ABC):
+    @abstractmethod
+    async def take(self, key: str, rate: float, capacity: int, cost: int = 1) -> float:
+        """
+        Takes `cost` tokens from the bucket; returns 0 if allowed, else
+        seconds until it would be. A cost above `capacity` needs a full
+        bucket and leaves it in debt, so the requests after it wait until
+        the whole cost has been refilled.
+        """
+
+
+class InMemoryTokenBucket(TokenBucketBackend):
+    """
+    Buckets held in this process, in an LRU bounded to `max_keys`. Each
+    worker enforces the limit on its own, so N workers allow up to N times
+    the configured rate.
+    """
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def take(self, key: str, rate: float, capacity: int, cost: int = 1) -> float:
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.get(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated_at) * rate)
+        needed = min(cost, capacity)
+        wait = 0.0
+        if tokens >= needed:
+            tokens -= cost
+        else:
+            wait = (needed - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        self._buckets.move_to_end(key)
+        while len(self._buckets) > self.max_keys:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class RedisTokenBucket(TokenBucketBackend):
+    """
+    Buckets shared by every worker, refilled and taken atomically by one Lua
+    script per request. If Redis is unreachable requests are let through,
+    so an outage of the limiter never takes the API down with it.
+    """
+
+    def __init__(self, url: str, client_factory: Optional[Callable[[str], aioredis.Redis]] = None):
+        self.url = url
+        self.client_factory = client_factory or aioredis.Redis.from_url
+        self._client: Optional[aioredis.Redis] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._take = None
+
+    def _get_take(self):
+        # redis.asyncio connections are bound to the loop that opened them
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = self.client_factory(self.url)
+            self._client_loop = loop
+            self._take = self._client.register_script(_REDIS_TAKE)
+        return self._take
+
+    async def take(self, key: str, rate: float, capacity: int, cost: int = 1) -> float:
+        try:
+            wait = await self._get_take()(keys=[f"rate-limit:{key}"], args=[rate, capacity, cost])
+            return float(wait)
+        except Exception as exc:
+            logging.error(f"rate limit redis call failed, allowing request: {exc}")
+            return 0.0
+
+
+def create_rate_limit_backend() -> TokenBucketBackend:
+    if Config.RATE_LIMIT_BACKEND == "redis":
+        return RedisTokenBucket(url=Config.RATE_LIMIT_REDIS_URL or Config.BROKER_URL)
+    return InMemoryTokenBucket(max_keys=Config.RATE_LIMIT_MAX_KEYS)
+
+
+rate_limit_backend = create_rate_limit_backend()
+
+
+def client_ip(request: Request) -> str:
+    if Config.RATE_LIMIT_TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+class RateLimit:
+    """
+    Token bucket of `burst` requests refilled at `per_minute`, one bucket per
+    client. Use `by_ip` on unauthenticated routes and `by_user` (keyed on the
+    JWT `sub`) elsewhere, as route dependencies so an over-limit request is
+    rejected with 429 and Retry-After before any expensive work. Bulk routes
+    call `check` themselves with a cost of one token per item; a bulk larger
+    than the burst leaves the bucket in debt, throttling what follows.
+    """
+
+    def __init__(self, name: str, per_minute: float, burst: int, backend: Optional[TokenBucketBackend] = None):
+        self.name = name
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.backend = backend
+
+    async def check(self, client_key: str, cost: int = 1):
+        """
+        Takes `cost` tokens (e.g. one per item of a bulk request). A cost
+        above the burst passes on a full bucket and puts it in debt, so the
+        client's writes still average out to the configured rate.
+
+        Raises:
+            HTTPException: 429 with Retry-After if the client is over the limit.
+        """
+        if not Config.RATE_LIMIT_ENABLED:
+            return
+        backend = self.backend or rate_limit_backend
+        wait = await backend.take(f"{self.name}:{client_key}", self.rate, self.burst, max(cost, 1))
+        if wait > 0:
+            RATE_LIMITED.labels(self.name).inc()
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests",
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+
+    @property
+    def by_ip(self):
+        async def dependency(request: Request):
+            await self.check(client_ip(request))
+        return dependency
+
+    @property
+    def by_user(self):
+        async def dependency(current_user: dict = Depends(get_current_user)):
+            await self.check(current_user.get("sub"))
+        return dependency
+
+
+login_rate_limit = RateLimit("login", Config.RATE_LIMIT_LOGIN_PER_MINUTE, Config.RATE_LIMIT_LOGIN_BURST)
+register_rate_limit = RateLimit("register", Config.RATE_LIMIT_REGISTER_PER_MINUTE, Config.RATE_LIMIT_REGISTER_BURST)
+refresh_rate_limit = RateLimit("refresh", Config.RATE_LIMIT_REFRESH_PER_MINUTE, Config.RATE_LIMIT_REFRESH_BURST)
+task_write_rate_limit = RateLimit(
+    "task_write", Config.RATE_LIMIT_TASK_WRITES_PER_MINUTE, Config.RATE_LIMIT_TASK_WRITES_BURST
+)
@@ -0,0 +1,27 @@
+from typing import Any
+
+import orjson
+from bson import ObjectId
+from fastapi.responses import JSONResponse
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """orjson encoding with ObjectId support; datetimes are encoded natively as RFC 3339."""
+    return orjson.dumps(content, default=_default)
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response rendered by orjson. Endpoints return it directly with
+    already shaped data, which skips response_model validation and
+    jsonable_encoder; response_model is still declared for the OpenAPI docs.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,79 @@
+import asyncio
+from typing import List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError, WriteError
+from pymongo.results import InsertOneResult
+
+from app.core.metrics import INSERT_BATCH_SIZE
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+class InsertBatcher:
+    """
+    Group commit for insert_one. Inserts that arrive within `window` seconds
+    of the first pending one are sent together as one unordered insert_many,
+    or as soon as `max_batch` documents are pending. Each caller still gets
+    its own InsertOneResult, or the exception for its own document: a
+    DuplicateKeyError or WriteError from the batch's writeErrors, or the
+    error of the whole batch if it failed outright.
+
+    `insert` is the bulk insert to call, normally the handler's insert_many.
+    The batch runs in its own task, so a caller that is cancelled while
+    waiting does not cancel the other callers' writes (nor its own).
+    """
+
+    def __init__(self, insert, collection_name: str, window: float, max_batch: int):
+        self.insert = insert
+        self.collection_name = collection_name
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: List[Tuple[dict, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes = set()
+
+    async def insert_one(self, document: dict) -> InsertOneResult:
+        # assigned here, as insert_one would, so the caller's document carries its _id
+        document.setdefault("_id", ObjectId())
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((document, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            flush = asyncio.create_task(self._write(batch))
+            # keep a reference until done, the loop only holds weak ones
+            self._flushes.add(flush)
+            flush.add_done_callback(self._flushes.discard)
+
+    async def _write(self, batch: List[Tuple[dict, asyncio.Future]]):
+        INSERT_BATCH_SIZE.labels(self.collection_name).observe(len(batch))
+        errors = {}
+        try:
+            await self.insert([document for document, _ in batch])
+        except BulkWriteError as exc:
+            errors = {error["index"]: error for error in exc.details.get("writeErrors", [])}
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        for index, (document, future) in enumerate(batch):
+            if future.done():
+                continue
+            error = errors.get(index)
+            if error is None:
+                future.set_result(InsertOneResult(document["_id"], acknowledged=True))
+            elif error.get("code") == DUPLICATE_KEY_ERROR:
+                future.set_exception(DuplicateKeyError(error.get("errmsg"), error.get("code"), error))
+            else:
+                future.set_exception(WriteError(error.get("errmsg"), error.get("code"), error))
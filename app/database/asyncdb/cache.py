@@ -0,0 +1,265 @@
+import asyncio
+import hashlib
+import logging
+import math
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, List, Optional, Tuple
+
+import bson
+import redis.asyncio as aioredis
+
+from app.core.config import Config
+
+# returns [collection generation, scope generation, cached value or false]
+# in one round trip
+_REDIS_GET = """
+local generation = redis.call('GET', KEYS[1]) or '0'
+local scope_generation = redis.call('GET', KEYS[2]) or '0'
+return {generation, scope_generation, redis.call('GET', ARGV[1] .. generation .. ':' .. scope_generation)}
+"""
+
+# moves every scope in KEYS[2..] to the next value of the collection's scope
+# clock (KEYS[1]); a scope key outlives the entries stored under it
+_REDIS_BUMP_SCOPES = """
+local clock = redis.call('INCR', KEYS[1])
+for i = 2, #KEYS do
+    redis.call('SET', KEYS[i], clock, 'EX', ARGV[1])
+end
+return clock
+"""
+
+MISS = object()
+
+# scope of reads not pinned to one document; every single-document write bumps it
+UNSCOPED = "*"
+
+
+def _normalize(value: Any, top_level: bool = False) -> Any:
+    """
+    Canonical form of a query so equivalent filters share a cache key.
+    Top-level fields and operator documents are order-insensitive and get
+    sorted; embedded documents matched by equality are order-sensitive in
+    MongoDB and are left as they are.
+    """
+    if isinstance(value, dict):
+        items = [(key, _normalize(item, top_level=key in ("$and", "$or", "$nor"))) for key, item in value.items()]
+        if top_level or all(key.startswith("$") for key in value):
+            items.sort(key=lambda item: item[0])
+        return {key: item for key, item in items}
+    if isinstance(value, list):
+        return [_normalize(item, top_level=top_level) for item in value]
+    return value
+
+
+class QueryCache:
+    """
+    Read-through cache for MongoDbHandler reads: an in-process LRU with a
+    TTL, optionally backed by a shared Redis tier.
+
+    Keys are the collection, its generation, the read's scope with the
+    scope's generation, and a digest of the normalized query, projection and
+    read options. A read pinned to one document by equality on the handler's
+    scope field (e.g. `_id`) is scoped to that document; any other read is
+    UNSCOPED. A single-document write bumps only its document's scope and
+    UNSCOPED, so cached reads of other documents survive it; a multi-document
+    write bumps the collection generation, invalidating every cached read of
+    the collection. With Redis the generations are shared, so other
+    processes stop reading stale Redis entries immediately; their local LRU
+    entries are bounded by `ttl`. `client_factory` builds the redis client
+    and can be swapped for fakeredis in tests.
+
+    Scope generations come from a per-collection clock so they only move
+    forward. A scope's record is dropped `ttl` after its last bump, when
+    every entry stored under an older generation has expired; a load that
+    took longer than `ttl` is therefore never stored, as its scope may have
+    been bumped and dropped meanwhile.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, redis_url: Optional[str] = None,
+                 client_factory: Optional[Callable[[str], aioredis.Redis]] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.redis_url = redis_url
+        self.client_factory = client_factory or aioredis.Redis.from_url
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._generations = defaultdict(int)
+        # (collection, scope) -> (generation, monotonic time of the last bump), oldest bump first
+        self._scope_generations: "OrderedDict[Tuple[str, str], Tuple[int, float]]" = OrderedDict()
+        self._scope_clocks = defaultdict(int)
+        self._stats = defaultdict(lambda: {"hits": 0, "redis_hits": 0, "misses": 0, "invalidations": 0})
+        self._redis: Optional[aioredis.Redis] = None
+        self._redis_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._redis_get = None
+        self._redis_bump_scopes = None
+
+    def _get_redis(self) -> Optional[aioredis.Redis]:
+        if not self.redis_url:
+            return None
+        # redis.asyncio connections are bound to the loop that opened them
+        loop = asyncio.get_running_loop()
+        if self._redis is None or self._redis_loop is not loop:
+            self._redis = self.client_factory(self.redis_url)
+            self._redis_loop = loop
+            self._redis_get = self._redis.register_script(_REDIS_GET)
+            self._redis_bump_scopes = self._redis.register_script(_REDIS_BUMP_SCOPES)
+        return self._redis
+
+    @staticmethod
+    def _generation_key(collection: str) -> str:
+        return f"query-cache:gen:{collection}"
+
+    @staticmethod
+    def _scope_generation_key(collection: str, scope: str) -> str:
+        return f"query-cache:gen:{collection}:{scope}"
+
+    @staticmethod
+    def scope(query: dict, field: str) -> str:
+        """The document a read is pinned to by equality on `field`, else UNSCOPED."""
+        value = query.get(field)
+        if value is None or isinstance(value, (dict, list)):
+            return UNSCOPED
+        return f"{field}:{value}"
+
+    @staticmethod
+    def digest(operation: str, query: dict, projection: Optional[dict], **options) -> str:
+        payload = {
+            "op": operation,
+            "query": _normalize(query, top_level=True),
+            "projection": _normalize(projection or {}, top_level=True),
+            "options": _normalize(options),
+        }
+        return hashlib.sha256(bson.encode(payload)).hexdigest()
+
+    def _scope_generation(self, collection: str, scope: str) -> int:
+        entry = self._scope_generations.get((collection, scope))
+        return entry[0] if entry is not None else 0
+
+    def _set_scope_generation(self, collection: str, scope: str, generation: int):
+        self._scope_generations[(collection, scope)] = (generation, time.monotonic())
+        self._scope_generations.move_to_end((collection, scope))
+        # past the ttl nothing stored under an older generation is still served
+        expired = time.monotonic() - self.ttl
+        while self._scope_generations:
+            oldest = next(iter(self._scope_generations))
+            if self._scope_generations[oldest][1] > expired:
+                break
+            del self._scope_generations[oldest]
+
+    def _local_key(self, collection: str, scope: str, digest: str,
+                   generation: Optional[Tuple[int, int, float]] = None) -> str:
+        if generation is None:
+            generation = self.generation(collection, scope)
+        return f"{collection}:{generation[0]}:{scope}:{generation[1]}:{digest}"
+
+    def generation(self, collection: str, scope: str = UNSCOPED) -> Tuple[int, int, float]:
+        """
+        The current (collection, scope) generation and the time it was read.
+        Read it before loading a value and pass it to `set`, so a write that
+        lands during the load is not hidden by storing the old result under
+        the new generation.
+        """
+        return self._generations[collection], self._scope_generation(collection, scope), time.monotonic()
+
+    async def get(self, collection: str, scope: str, digest: str) -> Any:
+        """Returns the cached value or MISS. Every hit is a fresh copy."""
+        stats = self._stats[collection]
+        key = self._local_key(collection, scope, digest)
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, data = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                stats["hits"] += 1
+                return bson.decode(data)["v"]
+            del self._entries[key]
+
+        redis = self._get_redis()
+        if redis is not None:
+            try:
+                generation, scope_generation, data = await self._redis_get(
+                    keys=[self._generation_key(collection), self._scope_generation_key(collection, scope)],
+                    args=[f"query-cache:{collection}:{digest}:"],
+                )
+                self._generations[collection] = max(self._generations[collection], int(generation))
+                if int(scope_generation) > self._scope_generation(collection, scope):
+                    self._set_scope_generation(collection, scope, int(scope_generation))
+                if data:
+                    stats["redis_hits"] += 1
+                    self._store_local(self._local_key(collection, scope, digest), data)
+                    return bson.decode(data)["v"]
+            except Exception as exc:
+                logging.error(f"query cache redis read failed: {exc}")
+
+        stats["misses"] += 1
+        return MISS
+
+    def _store_local(self, key: str, data: bytes):
+        self._entries[key] = (time.monotonic() + self.ttl, data)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def set(self, collection: str, scope: str, digest: str, value: Any, generation: Tuple[int, int, float]):
+        """Stores a value loaded under `generation`; skipped if its scope was written since."""
+        current = self.generation(collection, scope)
+        if generation[:2] != current[:2] or current[2] - generation[2] >= self.ttl:
+            return
+        data = bson.encode({"v": value})
+        self._store_local(self._local_key(collection, scope, digest, generation), data)
+        redis = self._get_redis()
+        if redis is not None:
+            try:
+                await redis.set(
+                    f"query-cache:{collection}:{digest}:{generation[0]}:{generation[1]}", data,
+                    ex=max(int(self.ttl), 1),
+                )
+            except Exception as exc:
+                logging.error(f"query cache redis write failed: {exc}")
+
+    async def invalidate(self, collection: str):
+        """Drops every cached read of the collection by moving to a new generation."""
+        self._generations[collection] += 1
+        self._stats[collection]["invalidations"] += 1
+        redis = self._get_redis()
+        if redis is not None:
+            try:
+                generation = await redis.incr(self._generation_key(collection))
+                self._generations[collection] = max(self._generations[collection], generation)
+            except Exception as exc:
+                logging.error(f"query cache redis invalidation failed: {exc}")
+
+    async def invalidate_scopes(self, collection: str, scopes: List[str]):
+        """Drops the cached reads of the given scopes (and UNSCOPED) only."""
+        scopes = [*scopes, UNSCOPED]
+        self._scope_clocks[collection] += 1
+        clock = self._scope_clocks[collection]
+        self._stats[collection]["invalidations"] += 1
+        redis = self._get_redis()
+        if redis is not None:
+            try:
+                clock = int(await self._redis_bump_scopes(
+                    keys=[f"query-cache:clock:{collection}",
+                          *(self._scope_generation_key(collection, scope) for scope in scopes)],
+                    args=[math.ceil(self.ttl) + 1],
+                ))
+                self._scope_clocks[collection] = max(self._scope_clocks[collection], clock)
+            except Exception as exc:
+                logging.error(f"query cache redis invalidation failed: {exc}")
+        for scope in scopes:
+            self._set_scope_generation(collection, scope, max(clock, self._scope_generation(collection, scope) + 1))
+
+    def stats(self) -> dict:
+        result = {}
+        for collection, stats in self._stats.items():
+            reads = stats["hits"] + stats["redis_hits"] + stats["misses"]
+            hit_ratio = (stats["hits"] + stats["redis_hits"]) / reads if reads else 0.0
+            result[collection] = {**stats, "hit_ratio": round(hit_ratio, 4)}
+        return result
+
+
+query_cache = QueryCache(
+    maxsize=Config.QUERY_CACHE_SIZE,
+    ttl=Config.QUERY_CACHE_TTL_SECONDS,
+    redis_url=Config.QUERY_CACHE_REDIS_URL,
+)
@@ -1,5 +1,16 @@
-from app.database.asyncdb.core import db
+from motor.motor_asyncio import AsyncIOMotorCollection
+
+from app.database.asyncdb.core import get_database
 from app.database.constant import DbNameConstants
 
-UsersCollection = db[DbNameConstants.UsersCollectionDb]
-TasksCollection = db[DbNameConstants.TasksCollectionDb]
+
+def get_collection(name: str) -> AsyncIOMotorCollection:
+    return get_database()[name]
+
+
+def users_collection() -> AsyncIOMotorCollection:
+    return get_collection(DbNameConstants.UsersCollectionDb)
+
+
+def tasks_collection() -> AsyncIOMotorCollection:
+    return get_collection(DbNameConstants.TasksCollectionDb)
@@ -1,7 +1,133 @@
-from motor.motor_asyncio import AsyncIOMotorClient,AsyncIOMotorGridFSBucket
+from typing import Optional
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+from pymongo import monitoring
 
 from app.core.config import Config
+from app.core.metrics import command_metrics
 
 MONGO_URI = Config.MONGO_URI
-client = AsyncIOMotorClient(MONGO_URI)
-db = client.get_default_database()
\ No newline at end of file
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """
+    Connection pool counters fed by pymongo's CMAP events. checkout_wait_*
+    is the time an operation waited for a pooled connection, which grows
+    when maxPoolSize is too small for the load.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.connections_open = 0
+        self.checked_out = 0
+        self.waiting = 0
+        self.checkouts = 0
+        self.checkout_failures = 0
+        self.checkout_wait_total_ms = 0.0
+        self.checkout_wait_max_ms = 0.0
+
+    def _record_wait(self, duration: float):
+        wait_ms = duration * 1000
+        self.checkout_wait_total_ms += wait_ms
+        self.checkout_wait_max_ms = max(self.checkout_wait_max_ms, wait_ms)
+
+    def connection_check_out_started(self, event):
+        self.waiting += 1
+
+    def connection_checked_out(self, event):
+        self.waiting -= 1
+        self.checked_out += 1
+        self.checkouts += 1
+        self._record_wait(event.duration)
+
+    def connection_check_out_failed(self, event):
+        self.waiting -= 1
+        self.checkout_failures += 1
+        self._record_wait(event.duration)
+
+    def connection_checked_in(self, event):
+        self.checked_out -= 1
+
+    def connection_created(self, event):
+        self.connections_open += 1
+
+    def connection_closed(self, event):
+        self.connections_open -= 1
+
+    def pool_created(self, event): pass
+    def pool_ready(self, event): pass
+    def pool_cleared(self, event): pass
+    def pool_closed(self, event): pass
+    def connection_ready(self, event): pass
+
+    def snapshot(self) -> dict:
+        return {
+            "max_pool_size": Config.MONGO_MAX_POOL_SIZE,
+            "connections_open": self.connections_open,
+            "checked_out": self.checked_out,
+            "waiting": self.waiting,
+            "checkouts": self.checkouts,
+            "checkout_failures": self.checkout_failures,
+            "checkout_wait_avg_ms": round(self.checkout_wait_total_ms / self.checkouts, 3) if self.checkouts else 0.0,
+            "checkout_wait_max_ms": round(self.checkout_wait_max_ms, 3),
+        }
+
+
+pool_stats = PoolStats()
+
+_client: Optional[AsyncIOMotorClient] = None
+_db: Optional[AsyncIOMotorDatabase] = None
+
+
+def _client_options() -> dict:
+    options = {
+        "maxPoolSize": Config.MONGO_MAX_POOL_SIZE,
+        "minPoolSize": Config.MONGO_MIN_POOL_SIZE,
+        "event_listeners": [pool_stats],
+    }
+    if Config.METRICS_ENABLED:
+        options["event_listeners"].append(command_metrics)
+    if Config.MONGO_MAX_IDLE_TIME_MS is not None:
+        options["maxIdleTimeMS"] = Config.MONGO_MAX_IDLE_TIME_MS
+    if Config.MONGO_WAIT_QUEUE_TIMEOUT_MS is not None:
+        options["waitQueueTimeoutMS"] = Config.MONGO_WAIT_QUEUE_TIMEOUT_MS
+    if Config.MONGO_COMPRESSORS:
+        options["compressors"] = Config.MONGO_COMPRESSORS
+    if Config.MONGO_ZLIB_COMPRESSION_LEVEL is not None:
+        options["zlibCompressionLevel"] = Config.MONGO_ZLIB_COMPRESSION_LEVEL
+    return options
+
+
+def connect(client: Optional[AsyncIOMotorClient] = None, db_name: Optional[str] = None) -> AsyncIOMotorClient:
+    """
+    Creates the process-wide client. Call it from inside the running event
+    loop (app lifespan, worker startup); `client` and `db_name` let tests and
+    benchmarks plug in their own client and database.
+    """
+    global _client, _db
+    if _client is not None:
+        return _client
+    _client = client or AsyncIOMotorClient(MONGO_URI, **_client_options())
+    _db = _client[db_name] if db_name else _client.get_default_database()
+    return _client
+
+
+def close():
+    global _client, _db
+    if _client is not None:
+        _client.close()
+    _client = None
+    _db = None
+    pool_stats.reset()
+
+
+def get_client() -> AsyncIOMotorClient:
+    return _client or connect()
+
+
+def get_database() -> AsyncIOMotorDatabase:
+    if _db is None:
+        connect()
+    return _db
@@ -0,0 +1,132 @@
+import logging
+from typing import Dict, List, Tuple, Union
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ASCENDING, TEXT, IndexModel
+from pymongo.errors import OperationFailure
+
+from app.database.constant import DbNameConstants
+
+# IndexOptionsConflict, IndexKeySpecsConflict
+INDEX_CONFLICT_CODES = (85, 86)
+DUPLICATE_KEY_ERROR = 11000
+
+# collection name -> indexes that must exist on it
+INDEXES: Dict[str, List[IndexModel]] = {
+    DbNameConstants.TasksCollectionDb: [
+        # enforces one task per title per user, so creates need no read-before-write
+        IndexModel([("user_id", ASCENDING), ("title", ASCENDING)], name="user_id_title", unique=True),
+        IndexModel([("user_id", ASCENDING), ("created_at", ASCENDING)], name="user_id_created_at"),
+        # keyset pagination of a user's tasks (filter on user_id, range + sort on _id)
+        IndexModel([("user_id", ASCENDING), ("_id", ASCENDING)], name="user_id_id"),
+        # status filter (and status sort) with _id as the keyset tie-breaker
+        IndexModel([("user_id", ASCENDING), ("status", ASCENDING), ("_id", ASCENDING)], name="user_id_status_id"),
+        # sort=title per user; the unique (user_id, title) index cannot also order by the _id tie-breaker
+        IndexModel([("user_id", ASCENDING), ("title", ASCENDING), ("_id", ASCENDING)], name="user_id_title_id"),
+        # /tasks/all: status filter or sort, and title sort, across every user
+        IndexModel([("status", ASCENDING), ("_id", ASCENDING)], name="status_id"),
+        IndexModel([("title", ASCENDING), ("_id", ASCENDING)], name="title_id"),
+        # prefixed by user_id so a search only reads the user's own matches;
+        # $text queries must then give user_id by equality
+        IndexModel([("user_id", ASCENDING), ("title", TEXT), ("description", TEXT)], name="user_id_title_description_text"),
+    ],
+    DbNameConstants.UsersCollectionDb: [
+        IndexModel([("email", ASCENDING)], name="email_unique", unique=True),
+    ],
+    DbNameConstants.ScheduledJobsCollectionDb: [
+        # due-job claiming and startup recovery
+        IndexModel([("due_at", ASCENDING)], name="due_at"),
+        IndexModel([("lease_token", ASCENDING)], name="lease_token"),
+    ],
+    DbNameConstants.RevokedTokensCollectionDb: [
+        # a revocation is only needed until the token would have expired anyway
+        IndexModel([("exp", ASCENDING)], name="exp_ttl", expireAfterSeconds=0),
+        # incremental sync of the in-memory revocation filter
+        IndexModel([("revoked_at", ASCENDING)], name="revoked_at"),
+    ],
+}
+
+# collection name -> indexes replaced by a registered one; dropped by the
+# migrate_indexes migration, never at startup
+OBSOLETE_INDEXES: Dict[str, List[str]] = {
+    DbNameConstants.TasksCollectionDb: ["title_description_text"],
+}
+
+# collection name -> representative hot queries, checked with explain(): a
+# filter, or (filter, sort) for the sorted list queries, whose sort must come
+# from the index rather than a blocking SORT stage
+HOT_QUERIES: Dict[str, List[Union[dict, Tuple[dict, List[tuple]]]]] = {
+    DbNameConstants.TasksCollectionDb: [
+        {"title": "", "user_id": ""},
+        {"_id": {"$in": []}, "user_id": ""},
+        ({"user_id": ""}, [("_id", ASCENDING)]),
+        ({"user_id": ""}, [("title", ASCENDING), ("_id", ASCENDING)]),
+        ({"user_id": ""}, [("status", ASCENDING), ("_id", ASCENDING)]),
+        ({"user_id": "", "status": ""}, [("_id", ASCENDING)]),
+        ({}, [("title", ASCENDING), ("_id", ASCENDING)]),
+        ({}, [("status", ASCENDING), ("_id", ASCENDING)]),
+        ({"status": ""}, [("_id", ASCENDING)]),
+        {"user_id": "", "$text": {"$search": "task"}},
+    ],
+    DbNameConstants.UsersCollectionDb: [
+        {"email": ""},
+    ],
+}
+
+
+async def ensure_indexes(db: AsyncIOMotorDatabase):
+    """
+    Creates every registered index. create_indexes is a no-op for indexes
+    that already exist with the same definition, so every worker can run it
+    at startup. Startup never drops an index: one that exists with other
+    options (e.g. not yet unique), or a unique index the existing data
+    violates, is left as it is and logged. Converting it is the job of the
+    one-off `python -m app.database.asyncdb.migrate_indexes` migration.
+    """
+    for collection_name, indexes in INDEXES.items():
+        collection = db[collection_name]
+        for index in indexes:
+            try:
+                await collection.create_indexes([index])
+            except OperationFailure as exc:
+                if exc.code not in INDEX_CONFLICT_CODES and exc.code != DUPLICATE_KEY_ERROR:
+                    raise
+                logging.error(
+                    f"index {index.document['name']} on {collection_name} could not be created: {exc}. "
+                    "Run python -m app.database.asyncdb.migrate_indexes"
+                )
+        logging.info(f"indexes ensured on {collection_name}")
+
+
+def _plan_stages(plan) -> List[str]:
+    if isinstance(plan, dict):
+        stages = [plan["stage"]] if "stage" in plan else []
+        for value in plan.values():
+            stages.extend(_plan_stages(value))
+        return stages
+    if isinstance(plan, list):
+        return [stage for item in plan for stage in _plan_stages(item)]
+    return []
+
+
+async def verify_hot_queries(db: AsyncIOMotorDatabase):
+    """
+    Explains every registered hot query and raises if the winning plan
+    falls back to a collection scan, or sorts a sorted query in memory.
+
+    Raises:
+        RuntimeError: If any hot query is planned as a COLLSCAN or a blocking SORT.
+    """
+    failures = []
+    for collection_name, queries in HOT_QUERIES.items():
+        for query in queries:
+            query, sort = query if isinstance(query, tuple) else (query, None)
+            cursor = db[collection_name].find(query)
+            if sort:
+                cursor = cursor.sort(sort)
+            explain = await cursor.explain()
+            stages = _plan_stages(explain.get("queryPlanner", {}).get("winningPlan", {}))
+            if "COLLSCAN" in stages or (sort and "SORT" in stages):
+                failures.append(f"{collection_name} {sorted(query)} sort {[field for field, _ in sort or []]}")
+    if failures:
+        raise RuntimeError(f"hot queries fall back to COLLSCAN or SORT: {', '.join(failures)}")
@@ -0,0 +1,129 @@
+"""
+One-off index migration for databases created by earlier versions, which
+startup (ensure_indexes) deliberately does not do:
+
+- Registered unique indexes that exist without `unique` are rebuilt as
+  unique once duplicates are resolved: tasks sharing a (user_id, title) keep
+  the oldest title and the others are renamed "title (2)", "title (3)", ...;
+  duplicate users cannot be merged safely and are only reported, leaving
+  their index as it is.
+- Indexes listed in OBSOLETE_INDEXES (e.g. the text index that was not
+  prefixed by user_id) are dropped and their replacements created.
+
+Run it once, with one process, before starting upgraded workers:
+
+    python -m app.database.asyncdb.migrate_indexes --dry-run
+    python -m app.database.asyncdb.migrate_indexes
+"""
+import argparse
+import asyncio
+import logging
+from typing import List
+
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo import IndexModel
+
+from app.database.asyncdb import core as mongo
+from app.database.asyncdb.indexes import INDEXES, OBSOLETE_INDEXES, ensure_indexes
+from app.database.constant import DbNameConstants
+
+
+async def find_duplicates(collection: AsyncIOMotorCollection, fields: List[str]) -> List[dict]:
+    """Groups of documents sharing the index key, each with its _ids oldest first."""
+    pipeline = [
+        {"$sort": {"_id": 1}},
+        {"$group": {"_id": {field: f"${field}" for field in fields}, "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ]
+    return await collection.aggregate(pipeline, allowDiskUse=True).to_list(length=None)
+
+
+async def rename_duplicate_titles(collection: AsyncIOMotorCollection, groups: List[dict], dry_run: bool) -> int:
+    renamed = 0
+    for group in groups:
+        user_id, title = group["_id"]["user_id"], group["_id"]["title"]
+        suffix = 1
+        for task_id in group["ids"][1:]:
+            suffix += 1
+            while await collection.find_one({"user_id": user_id, "title": f"{title} ({suffix})"}, {"_id": 1}):
+                suffix += 1
+            new_title = f"{title} ({suffix})"
+            logging.warning(f"task {task_id} of user {user_id}: {title!r} -> {new_title!r}")
+            if not dry_run:
+                await collection.update_one({"_id": task_id}, {"$set": {"title": new_title}, "$inc": {"version": 1}})
+            renamed += 1
+    return renamed
+
+
+async def make_unique(collection: AsyncIOMotorCollection, index: IndexModel, dry_run: bool) -> bool:
+    """Rebuilds `index` as unique; returns False if duplicates remain."""
+    name = index.document["name"]
+    fields = list(index.document["key"])
+    existing = (await collection.index_information()).get(name)
+    if existing and existing.get("unique"):
+        logging.warning(f"{collection.name}.{name} is already unique")
+        return True
+
+    groups = await find_duplicates(collection, fields)
+    if groups and collection.name == DbNameConstants.TasksCollectionDb:
+        renamed = await rename_duplicate_titles(collection, groups, dry_run)
+        logging.warning(f"{'would rename' if dry_run else 'renamed'} {renamed} duplicate task titles")
+        groups = []
+    if groups:
+        for group in groups:
+            logging.error(f"{collection.name} duplicates for {group['_id']}: {group['ids']}")
+        logging.error(f"{collection.name}.{name} left non-unique, resolve the duplicates above and run again")
+        return False
+    if dry_run:
+        logging.warning(f"would rebuild {collection.name}.{name} as unique")
+        return True
+
+    if existing:
+        await collection.drop_index(name)
+    try:
+        await collection.create_indexes([index])
+    except Exception:
+        # a duplicate written since the scan: put the old index back
+        if existing:
+            await collection.create_indexes([IndexModel(list(existing["key"]), name=name)])
+        raise
+    logging.warning(f"rebuilt {collection.name}.{name} as unique")
+    return True
+
+
+async def drop_obsolete(collection: AsyncIOMotorCollection, names: List[str], dry_run: bool):
+    existing = await collection.index_information()
+    for name in names:
+        if name in existing:
+            logging.warning(f"{'would drop' if dry_run else 'dropping'} obsolete index {collection.name}.{name}")
+            if not dry_run:
+                await collection.drop_index(name)
+
+
+async def migrate(db: AsyncIOMotorDatabase, dry_run: bool = False) -> bool:
+    ok = True
+    for collection_name, indexes in INDEXES.items():
+        for index in indexes:
+            if index.document.get("unique"):
+                ok = await make_unique(db[collection_name], index, dry_run) and ok
+    for collection_name, names in OBSOLETE_INDEXES.items():
+        await drop_obsolete(db[collection_name], names, dry_run)
+    if not dry_run:
+        # creates the replacements of the dropped indexes
+        await ensure_indexes(db)
+    return ok
+
+
+async def main(dry_run: bool):
+    mongo.connect()
+    try:
+        if not await migrate(mongo.get_database(), dry_run):
+            raise SystemExit(1)
+    finally:
+        mongo.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dry-run", action="store_true", help="report what would change without writing")
+    asyncio.run(main(parser.parse_args().dry_run))
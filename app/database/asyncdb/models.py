@@ -1,11 +1,48 @@
+from app.core.config import Config
 from app.database.asyncdb.mongo_handler import MongoDbHandler
-from app.database.asyncdb.collections import *
+from app.database.constant import DbNameConstants
 
 class Users(MongoDbHandler):
     def __init__(self):
-        super().__init__(UsersCollection)
+        super().__init__(DbNameConstants.UsersCollectionDb)
 
 
 class Tasks(MongoDbHandler):
     def __init__(self):
-        super().__init__(TasksCollection)
+        super().__init__(DbNameConstants.TasksCollectionDb)
+
+
+class ScheduledJobs(MongoDbHandler):
+    def __init__(self):
+        super().__init__(DbNameConstants.ScheduledJobsCollectionDb)
+
+
+class ChangeStreamTokens(MongoDbHandler):
+    def __init__(self):
+        super().__init__(DbNameConstants.ChangeStreamTokensCollectionDb)
+
+
+class TaskUserMeta(MongoDbHandler):
+    def __init__(self):
+        super().__init__(DbNameConstants.TaskUserMetaCollectionDb)
+
+
+class RevokedTokens(MongoDbHandler):
+    def __init__(self):
+        super().__init__(DbNameConstants.RevokedTokensCollectionDb)
+
+
+# Handlers hold no per-request state, so one instance of each is shared
+users_db = Users()
+tasks_db = Tasks()
+scheduled_jobs_db = ScheduledJobs()
+change_stream_tokens_db = ChangeStreamTokens()
+task_user_meta_db = TaskUserMeta()
+revoked_tokens_db = RevokedTokens()
+
+if Config.TASK_INSERT_BATCHING_ENABLED:
+    # task creates are the burstiest insert_one path
+    tasks_db.enable_insert_batching(
+        window=Config.TASK_INSERT_BATCH_WINDOW_MS / 1000,
+        max_batch=Config.TASK_INSERT_BATCH_SIZE,
+    )
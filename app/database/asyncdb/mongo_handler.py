@@ -1,13 +1,47 @@
 from motor.motor_asyncio import AsyncIOMotorCollection
-from typing import List, Dict, Optional
-from pymongo import ASCENDING, DESCENDING
+from typing import AsyncIterator, List, Dict, Optional
+from pymongo import ASCENDING, DESCENDING, ReturnDocument
+
+from app.core.config import Config
+from app.database.asyncdb.batcher import InsertBatcher
+from app.database.asyncdb.cache import MISS, UNSCOPED, QueryCache, query_cache
+from app.database.asyncdb.core import get_database
+from app.database.asyncdb.single_flight import SingleFlight, single_flight
+
+
+# above this many documents a write invalidates the whole collection instead
+MAX_SCOPED_INVALIDATIONS = 100
 
 
 class MongoDbHandler:
-    def __init__(self, collection: AsyncIOMotorCollection):
-        if not isinstance(collection, AsyncIOMotorCollection):
-            raise TypeError("collection must be an instance of AsyncIOMotorCollection")
-        self.collection = collection
+    # reads pinned to one value of this field are cached per value, so a
+    # single-document write invalidates only that document's reads
+    cache_scope_field = "_id"
+
+    def __init__(self, collection_name: str):
+        if not isinstance(collection_name, str):
+            raise TypeError("collection_name must be a str")
+        self.collection_name = collection_name
+        self._db = None
+        self._collection: Optional[AsyncIOMotorCollection] = None
+        # reads opt in per call with use_cache=True; writes invalidate what they touch
+        self.cache: Optional[QueryCache] = query_cache if Config.QUERY_CACHE_ENABLED else None
+        self.single_flight: Optional[SingleFlight] = single_flight if Config.SINGLE_FLIGHT_ENABLED else None
+        # set by enable_insert_batching; insert_one then goes through it
+        self.insert_batcher: Optional[InsertBatcher] = None
+
+    def enable_insert_batching(self, window: float, max_batch: int):
+        """Coalesces concurrent insert_one calls into insert_many; see InsertBatcher."""
+        self.insert_batcher = InsertBatcher(self.insert_many, self.collection_name, window, max_batch)
+
+    @property
+    def collection(self) -> AsyncIOMotorCollection:
+        # resolved lazily so the handler survives the client being (re)created
+        db = get_database()
+        if db is not self._db:
+            self._db = db
+            self._collection = db[self.collection_name]
+        return self._collection
 
     def _check_dict(self, param, is_filter=False):
         if not isinstance(param, dict):
@@ -25,20 +59,134 @@ class MongoDbHandler:
         if not isinstance(param, list):
             raise TypeError("Input must be a list")
 
-    async def find(self, query: dict, projection: dict = {"_id": 0}, sort: Optional[dict] = None) -> List[dict]:
+    async def _cached(self, use_cache: bool, operation: str, query: dict, projection: Optional[dict], load, **options):
+        use_cache = use_cache and self.cache is not None
+        if not use_cache and self.single_flight is None:
+            return await load()
+        digest = QueryCache.digest(operation, query, projection, **options)
+        if self.single_flight is not None:
+            query_load = load
+
+            async def load():
+                return await self.single_flight.do(self.collection_name, digest, query_load)
+
+        if not use_cache:
+            return await load()
+        scope = QueryCache.scope(query, self.cache_scope_field)
+        value = await self.cache.get(self.collection_name, scope, digest)
+        if value is MISS:
+            # taken before the load: a write during it must not be cached over
+            generation = self.cache.generation(self.collection_name, scope)
+            value = await load()
+            await self.cache.set(self.collection_name, scope, digest, value, generation)
+        return value
+
+    def _write_scopes(self, documents: List[dict], update: Optional[dict] = None) -> Optional[List[str]]:
+        """
+        Cache scopes a write to `documents` (filters or inserted documents)
+        can change, or None when it may reach beyond them: a document without
+        the scope field, an update that sets it, or a replacement.
+        """
+        if update is not None and not all(key.startswith("$") for key in update):
+            return None
+        if update is not None and any(self.cache_scope_field in fields for fields in update.values()
+                                      if isinstance(fields, dict)):
+            return None
+        if len(documents) > MAX_SCOPED_INVALIDATIONS:
+            return None
+        scopes = [QueryCache.scope(document, self.cache_scope_field) for document in documents]
+        if UNSCOPED in scopes:
+            return None
+        return scopes
+
+    async def _write(self, operation, documents: Optional[List[dict]] = None, update: Optional[dict] = None):
+        """
+        Runs a write, then invalidates the cached reads it may have changed:
+        only the scopes of `documents` when they pin it down, otherwise (and
+        for every multi-document write) the whole collection.
+        """
+        try:
+            return await operation
+        finally:
+            if self.single_flight is not None:
+                self.single_flight.forget(self.collection_name)
+            if self.cache is not None:
+                # read after the write, so inserted documents carry their _id
+                scopes = self._write_scopes(documents, update) if documents is not None else None
+                if scopes is None:
+                    await self.cache.invalidate(self.collection_name)
+                else:
+                    await self.cache.invalidate_scopes(self.collection_name, scopes)
+
+    async def find(self, query: dict, projection: dict = {"_id": 0}, sort: Optional[dict] = None,
+                   limit: int = 0, use_cache: bool = False) -> List[dict]:
+        """Returns the matching documents, at most `limit` of them unless it is 0."""
+        self._check_dict(query)
+
+        async def load():
+            cursor = self.collection.find(query, projection)
+            if sort:
+                cursor = cursor.sort(sort.get("sort_key"), sort.get("sort_value", ASCENDING))
+            if limit:
+                cursor = cursor.limit(limit)
+            return await cursor.to_list(length=None)
+
+        return await self._cached(use_cache, "find", query, projection, load, sort=sort, limit=limit)
+
+    async def iter_find(self, query: dict, projection: dict = {"_id": 0}, sort: Optional[dict] = None,
+                        batch_size: int = 500) -> AsyncIterator[dict]:
+        """
+        Yields documents one at a time, fetching them from the server in
+        batches of `batch_size` so memory stays bounded for large results.
+        """
         self._check_dict(query)
-        cursor = self.collection.find(query, projection)
+        cursor = self.collection.find(query, projection, batch_size=batch_size)
         if sort:
             cursor = cursor.sort(sort.get("sort_key"), sort.get("sort_value", ASCENDING))
-        return await cursor.to_list(length=None)
+        async for doc in cursor:
+            yield doc
 
-    async def find_one(self, query: dict, projection: dict = {"_id": 0}) -> Optional[dict]:
+    async def aggregate(self, pipeline: List[dict], use_cache: bool = False) -> List[dict]:
+        self._check_list(pipeline)
+        return await self._cached(
+            use_cache, "aggregate", {}, None,
+            lambda: self.collection.aggregate(pipeline).to_list(length=None),
+            pipeline=pipeline,
+        )
+
+    async def iter_aggregate(self, pipeline: List[dict], batch_size: int = 500) -> AsyncIterator[dict]:
+        """Streaming counterpart of aggregate, fetched in batches of `batch_size`."""
+        self._check_list(pipeline)
+        async for doc in self.collection.aggregate(pipeline, batchSize=batch_size):
+            yield doc
+
+    async def find_one(self, query: dict, projection: dict = {"_id": 0}, use_cache: bool = False) -> Optional[dict]:
         self._check_dict(query)
-        return await self.collection.find_one(query, projection)
+        return await self._cached(
+            use_cache, "find_one", query, projection,
+            lambda: self.collection.find_one(query, projection),
+        )
 
     async def insert_one(self, data: dict):
         self._check_dict(data)
-        return await self.collection.insert_one(data)
+        if self.insert_batcher is not None:
+            return await self.insert_batcher.insert_one(data)
+        return await self._write(self.collection.insert_one(data), [data])
+
+    async def insert_many(self, data: list, ordered: bool = False):
+        """
+        Inserts all documents in one round trip. Unordered by default so one
+        failing document (e.g. a duplicate key) does not stop the rest; the
+        failures are reported through BulkWriteError.details["writeErrors"].
+        """
+        self._check_list(data)
+        for doc in data:
+            self._check_dict(doc)
+        return await self._write(self.collection.insert_many(data, ordered=ordered), data)
+
+    async def bulk_write(self, requests: list, ordered: bool = False):
+        self._check_list(requests)
+        return await self._write(self.collection.bulk_write(requests, ordered=ordered))
 
     async def update_one(self, filter: dict, data: dict, upsert: bool = False, array_filters: list = None):
         if not filter:
@@ -49,19 +197,32 @@ class MongoDbHandler:
         if array_filters:
             update_params = {"upsert": upsert}
             update_params["array_filters"] = array_filters
-            return await self.collection.update_one(filter, data, **update_params)
+            return await self._write(self.collection.update_one(filter, data, **update_params), [filter], data)
+
+        return await self._write(self.collection.update_one(filter, data, upsert=upsert), [filter], data)
 
-        return await self.collection.update_one(filter, data, upsert=upsert)
+    async def update_many(self, filter: dict, data: dict):
+        self._check_dict(data)
+        self._check_dict(filter, is_filter=True)
+        return await self._write(self.collection.update_many(filter, data))
 
     async def delete_one(self, filter: dict):
         self._check_dict(filter)
-        return await self.collection.delete_one(filter)
+        return await self._write(self.collection.delete_one(filter), [filter])
+
+    async def delete_many(self, filter: dict):
+        self._check_dict(filter, is_filter=True)
+        return await self._write(self.collection.delete_many(filter))
 
-    async def find_one_and_delete(self, filter: dict):
+    async def find_one_and_delete(self, filter: dict, projection: Optional[dict] = None):
         self._check_dict(filter)
-        return await self.collection.find_one_and_delete(filter)
+        return await self._write(self.collection.find_one_and_delete(filter, projection), [filter])
     
-    async def find_one_and_update(self, filter: dict, update: dict,projection: dict = {"_id": 0}):
+    async def find_one_and_update(self, filter: dict, update: dict,projection: dict = {"_id": 0},
+                                  return_document: bool = ReturnDocument.BEFORE):
         self._check_dict(filter, is_filter=True)
         self._check_dict(update)
-        return await self.collection.find_one_and_update(filter, update,projection)
+        return await self._write(
+            self.collection.find_one_and_update(filter, update, projection, return_document=return_document),
+            [filter], update,
+        )
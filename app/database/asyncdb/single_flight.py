@@ -0,0 +1,73 @@
+import asyncio
+import copy
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict
+
+from app.core.metrics import SINGLE_FLIGHT_DEDUPLICATED
+
+
+class _Flight:
+    __slots__ = ("task", "joiners", "snapshot")
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.joiners = 0
+        self.snapshot: Any = None
+
+
+class SingleFlight:
+    """
+    Coalesces identical concurrent reads. The first caller for a key runs
+    the query; callers that arrive while it is in flight await the same
+    result instead of sending their own. The first caller gets the result
+    itself and every joiner its own deep copy, taken from a snapshot made
+    as the query completes, before any caller resumes, so callers can
+    modify what they get without affecting each other.
+
+    A write to a collection forgets its in-flight reads: callers already
+    waiting still share the read they joined, but later callers start a
+    fresh one that sees the write.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, Dict[str, _Flight]] = defaultdict(dict)
+        self._stats = defaultdict(lambda: {"queries": 0, "deduplicated": 0})
+
+    async def do(self, collection: str, key: str, load: Callable[[], Awaitable[Any]]) -> Any:
+        flight = self._inflight[collection].get(key)
+        if flight is not None:
+            flight.joiners += 1
+            self._stats[collection]["deduplicated"] += 1
+            SINGLE_FLIGHT_DEDUPLICATED.labels(collection).inc()
+            # shielded so one caller's cancellation does not fail the others
+            await asyncio.shield(flight.task)
+            return copy.deepcopy(flight.snapshot)
+
+        self._stats[collection]["queries"] += 1
+        flight = _Flight(asyncio.ensure_future(load()))
+        self._inflight[collection][key] = flight
+        flight.task.add_done_callback(lambda task: self._landed(collection, key, flight))
+        return await asyncio.shield(flight.task)
+
+    def _landed(self, collection: str, key: str, flight: _Flight):
+        # runs before any awaiting caller resumes: nobody can join from here
+        # on, and the snapshot predates whatever the first caller does
+        inflight = self._inflight.get(collection)
+        if inflight is not None and inflight.get(key) is flight:
+            del inflight[key]
+        if flight.joiners and not flight.task.cancelled() and flight.task.exception() is None:
+            flight.snapshot = copy.deepcopy(flight.task.result())
+
+    def forget(self, collection: str):
+        self._inflight.pop(collection, None)
+
+    def stats(self) -> dict:
+        result = {}
+        for collection, stats in self._stats.items():
+            reads = stats["queries"] + stats["deduplicated"]
+            ratio = stats["deduplicated"] / reads if reads else 0.0
+            result[collection] = {**stats, "deduplicated_ratio": round(ratio, 4)}
+        return result
+
+
+single_flight = SingleFlight()
@@ -4,3 +4,7 @@ class DbNameConstants:
     """
     TasksCollectionDb = "Tasks"
     UsersCollectionDb = "Users"
+    ScheduledJobsCollectionDb = "ScheduledJobs"
+    ChangeStreamTokensCollectionDb = "ChangeStreamTokens"
+    TaskUserMetaCollectionDb = "TaskUserMeta"
+    RevokedTokensCollectionDb = "RevokedTokens"
@@ -1,12 +1,100 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI, Response
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, generate_latest
+
+from app.auth.hashing import password_hasher
+from app.auth.revocation import revocation_list
 from app.auth.routes import router as auth_router
+from app.core.config import Config
+from app.core.dependencies import is_admin_user, token_cache
+from app.core.metrics import PrometheusMiddleware, TokenCacheCollector, WebSocketCollector
+from app.database.asyncdb import core as mongo
+from app.database.asyncdb.cache import query_cache
+from app.database.asyncdb.indexes import ensure_indexes, verify_hot_queries
+from app.database.asyncdb.single_flight import single_flight
+from app.profiling.profiler import ProfilingMiddleware, request_profiler
+from app.profiling.routes import router as profiling_router
+from app.scheduler.scheduler import scheduler
 from app.tasks.routes import router as task_router
-from app.websockets.manager import ConnectionManager
+from app.tasks.watcher import TaskChangeWatcher
+from app.websockets.manager import manager
 from app.websockets.router import router as websocket_router
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    mongo.connect()
+    db = mongo.get_database()
+    await ensure_indexes(db)
+    if Config.MONGO_INDEX_SELF_CHECK:
+        await verify_hot_queries(db)
+    await revocation_list.start()
+    app.state.manager = manager
+    await manager.start()
+    await scheduler.start()
+    if Config.TASK_CHANGE_STREAM_ENABLED:
+        await task_watcher.start()
+    yield
+    await task_watcher.stop()
+    await scheduler.stop()
+    await manager.stop()
+    await revocation_list.stop()
+    password_hasher.shutdown()
+    mongo.close()
+
+
+task_watcher = TaskChangeWatcher(manager)
+
+
+app = FastAPI(lifespan=lifespan)
+if Config.METRICS_ENABLED:
+    app.add_middleware(PrometheusMiddleware)
+    REGISTRY.register(WebSocketCollector(manager))
+    REGISTRY.register(TokenCacheCollector(token_cache))
+if Config.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware, profiler=request_profiler)
 app.include_router(auth_router, prefix="/auth", tags=["auth"])
 app.include_router(task_router, prefix="/tasks", tags=["tasks"])
 
 app.include_router(websocket_router, prefix="/websocket", tags=["websocket"])
+if Config.PROFILING_ENABLED:
+    app.include_router(
+        profiling_router, prefix="/admin/profiling", tags=["admin"], dependencies=[Depends(is_admin_user)]
+    )
+
+
+@app.get("/admin/db/pool", tags=["admin"], dependencies=[Depends(is_admin_user)])
+async def mongo_pool_stats():
+    """Mongo connection pool counters, including how long operations waited for a connection."""
+    return mongo.pool_stats.snapshot()
+
+
+@app.get("/admin/db/cache", tags=["admin"], dependencies=[Depends(is_admin_user)])
+async def query_cache_stats():
+    """Per-collection read cache hits, misses, invalidations and hit ratio."""
+    return query_cache.stats()
+
+
+@app.get("/admin/db/single-flight", tags=["admin"], dependencies=[Depends(is_admin_user)])
+async def single_flight_stats():
+    """Per-collection reads sent to Mongo and reads that joined an identical one in flight."""
+    return single_flight.stats()
+
+
+@app.get("/admin/auth/revocations", tags=["admin"], dependencies=[Depends(is_admin_user)])
+async def revocation_stats():
+    """Size of the token revocation filter and how often it sent a check to the database."""
+    return revocation_list.stats()
+
+
+@app.get("/admin/auth/token-cache", tags=["admin"], dependencies=[Depends(is_admin_user)])
+async def token_cache_stats():
+    """Size of the verified-token cache and how often it spared a jwt.decode."""
+    return token_cache.stats()
+
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint."""
+    return Response(generate_latest(REGISTRY), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,138 @@
+import itertools
+import random
+import time
+from collections import deque
+from typing import Deque, Dict, Iterator, List, Optional
+
+from pyinstrument import Profiler
+from pyinstrument.renderers import SpeedscopeRenderer
+from pyinstrument.session import Session
+from starlette.routing import Match
+
+from app.core.config import Config
+
+
+def _collapsed_lines(frame, stack: List[str]) -> Iterator[str]:
+    stack = stack + [f"{frame.function} ({frame.file_path_short}:{frame.line_no})"]
+    self_time = frame.time - sum(child.time for child in frame.children)
+    if self_time > 0:
+        yield f"{';'.join(stack)} {round(self_time * 1e6)}"
+    for child in frame.children:
+        yield from _collapsed_lines(child, stack)
+
+
+def render_collapsed(session: Session) -> str:
+    """Brendan Gregg's folded-stack format, weighted by self time in microseconds."""
+    root = session.root_frame()
+    return "\n".join(_collapsed_lines(root, [])) + "\n" if root else ""
+
+
+class RequestProfiler:
+    """
+    Samples whole requests with pyinstrument, either a random fraction of all
+    requests or the next N requests to given route templates. Finished
+    profiles go into a bounded ring buffer, oldest dropped first.
+
+    pyinstrument runs in async mode, so a profile only covers time spent in
+    its own request's task, plus the time that task spent awaiting.
+    """
+
+    def __init__(self, interval: float, buffer_size: int):
+        self.interval = interval
+        self.sample_rate = 0.0
+        self.targets: Dict[str, int] = {}
+        self.profiles: Deque[dict] = deque(maxlen=buffer_size)
+        self._ids = itertools.count(1)
+
+    @property
+    def active(self) -> bool:
+        return self.sample_rate > 0 or bool(self.targets)
+
+    def reset(self):
+        self.sample_rate = 0.0
+        self.targets.clear()
+
+    def add_target(self, route: str, count: int):
+        self.targets[route] = self.targets.get(route, 0) + count
+
+    def _route_template(self, app, scope) -> Optional[str]:
+        for route in app.router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route.path
+        return None
+
+    def should_profile(self, app, scope) -> bool:
+        if self.targets:
+            route = self._route_template(app, scope)
+            remaining = self.targets.get(route)
+            if remaining:
+                if remaining == 1:
+                    del self.targets[route]
+                else:
+                    self.targets[route] = remaining - 1
+                return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def record(self, scope, status: int, session: Session):
+        self.profiles.append({
+            "id": next(self._ids),
+            "method": scope["method"],
+            "path": scope["path"],
+            "route": getattr(scope.get("route"), "path", None),
+            "status": status,
+            "duration_ms": round(session.duration * 1000, 3),
+            "samples": session.sample_count,
+            "recorded_at": time.time(),
+            "session": session,
+        })
+
+    def summaries(self) -> List[dict]:
+        return [{key: value for key, value in profile.items() if key != "session"} for profile in self.profiles]
+
+    def get(self, profile_id: int) -> Optional[dict]:
+        return next((profile for profile in self.profiles if profile["id"] == profile_id), None)
+
+    @staticmethod
+    def render(profile: dict, fmt: str) -> str:
+        if fmt == "collapsed":
+            return render_collapsed(profile["session"])
+        return SpeedscopeRenderer().render(profile["session"])
+
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware handing sampled requests to RequestProfiler. While
+    nothing is being sampled each request costs one attribute check.
+    """
+
+    def __init__(self, app, profiler: "RequestProfiler"):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if not self.profiler.active or scope["type"] != "http" \
+                or not self.profiler.should_profile(scope["app"], scope):
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        profiler = Profiler(interval=self.profiler.interval, async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profiler.stop()
+            self.profiler.record(scope, status, profiler.last_session)
+
+
+request_profiler = RequestProfiler(
+    interval=Config.PROFILING_INTERVAL_MS / 1000,
+    buffer_size=Config.PROFILING_BUFFER_SIZE,
+)
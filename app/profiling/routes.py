@@ -0,0 +1,60 @@
+from fastapi import APIRouter, HTTPException, Response, status
+
+from app.profiling.profiler import request_profiler
+from app.profiling.schemas import ProfileFormat, ProfilingSampleModel, ProfilingTargetModel
+
+router = APIRouter()
+
+
+def _state() -> dict:
+    return {
+        "sample_rate": request_profiler.sample_rate,
+        "targets": dict(request_profiler.targets),
+        "profiles": request_profiler.summaries(),
+    }
+
+
+@router.get("")
+async def profiling_state():
+    """Current sampling settings and the profiles held in the ring buffer, newest last."""
+    return _state()
+
+
+@router.put("/sample")
+async def set_sample_rate(payload: ProfilingSampleModel):
+    """Profiles a random `sample_rate` fraction of all requests (0 turns random sampling off)."""
+    request_profiler.sample_rate = payload.sample_rate
+    return _state()
+
+
+@router.post("/targets")
+async def add_target(payload: ProfilingTargetModel):
+    """Profiles the next `count` requests whose route template is `route`."""
+    request_profiler.add_target(payload.route, payload.count)
+    return _state()
+
+
+@router.delete("")
+async def stop_profiling(clear: bool = False):
+    """Stops all sampling; `clear=true` also empties the ring buffer."""
+    request_profiler.reset()
+    if clear:
+        request_profiler.profiles.clear()
+    return _state()
+
+
+@router.get("/{profile_id}")
+async def download_profile(profile_id: int, format: ProfileFormat = ProfileFormat.speedscope):
+    """
+    Downloads one profile, as a speedscope JSON file (open it at
+    https://www.speedscope.app) or as collapsed stacks for flamegraph.pl.
+    """
+    profile = request_profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+    body = request_profiler.render(profile, format.value)
+    if format == ProfileFormat.collapsed:
+        return Response(body, media_type="text/plain",
+                        headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.folded"'})
+    return Response(body, media_type="application/json",
+                    headers={"Content-Disposition": f'attachment; filename="profile-{profile_id}.speedscope.json"'})
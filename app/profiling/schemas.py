@@ -0,0 +1,17 @@
+from enum import Enum
+
+from pydantic import BaseModel, Field
+
+
+class ProfileFormat(str, Enum):
+    speedscope = "speedscope"
+    collapsed = "collapsed"
+
+
+class ProfilingSampleModel(BaseModel):
+    sample_rate: float = Field(..., ge=0.0, le=1.0)
+
+
+class ProfilingTargetModel(BaseModel):
+    route: str = Field(..., min_length=1, description="Route template, e.g. /tasks/update/{task_id}")
+    count: int = Field(..., gt=0, le=1000)
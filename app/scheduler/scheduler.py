@@ -0,0 +1,190 @@
+import asyncio
+import heapq
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from bson import ObjectId
+
+from app.core.config import Config
+from app.database.asyncdb.models import scheduled_jobs_db
+
+# lease_until of a job nobody holds
+UNLEASED = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+class JobScheduler:
+    """
+    Durable delayed jobs. Every job is a document in the ScheduledJobs
+    collection, so pending work survives restarts and deploys; in memory the
+    scheduler only keeps a heap of due timestamps to know when to wake up.
+
+    Each tick claims a batch of at most `batch_size` due jobs, oldest first,
+    with one update_many that stamps a lease (owner, token, expiry), runs the
+    claimed jobs and deletes the finished ones with one delete_many. The
+    lease is renewed while the batch runs, so a slow batch is not claimed
+    again by another worker; a job whose worker dies is claimed again once
+    its lease expires. Jobs that fell due while no worker was running are
+    picked up by the ticks after startup, one batch at a time, so a backlog
+    is spread over every running worker.
+    """
+
+    def __init__(self, lease_seconds: float, poll_interval: float, max_attempts: int, max_concurrency: int,
+                 batch_size: int):
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.max_concurrency = max_concurrency
+        self.batch_size = batch_size
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._handlers: Dict[str, Callable[..., Awaitable]] = {}
+        self._due: List[float] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._runner: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _utcnow() -> datetime:
+        return datetime.now(timezone.utc)
+
+    def register(self, name: str, handler: Callable[..., Awaitable]):
+        self._handlers[name] = handler
+
+    def _remember(self, due_at: datetime):
+        due = due_at.timestamp()
+        wake_earlier = not self._due or due < self._due[0]
+        heapq.heappush(self._due, due)
+        if wake_earlier and self._wakeup is not None:
+            self._wakeup.set()
+
+    def _job(self, name: str, due_at: datetime, kwargs: dict) -> dict:
+        return {
+            "name": name,
+            "kwargs": kwargs,
+            "due_at": due_at,
+            "lease_owner": None,
+            "lease_token": None,
+            "lease_until": UNLEASED,
+            "attempts": 0,
+        }
+
+    async def schedule(self, name: str, delay: float, **kwargs) -> ObjectId:
+        """Persists a job that runs `handler(**kwargs)` after `delay` seconds."""
+        due_at = self._utcnow() + timedelta(seconds=delay)
+        result = await scheduled_jobs_db.insert_one(self._job(name, due_at, kwargs))
+        self._remember(due_at)
+        return result.inserted_id
+
+    async def start(self):
+        if self._runner is None:
+            self._wakeup = asyncio.Event()
+            self._runner = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._runner is not None:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+
+    def _next_wait(self) -> float:
+        if not self._due:
+            return self.poll_interval
+        return min(max(self._due[0] - time.time(), 0), self.poll_interval)
+
+    async def _run(self):
+        while True:
+            try:
+                # the first tick also recovers jobs that became due while no worker ran
+                await self.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logging.error(f"error occured in scheduler tick {exc}", exc_info=True)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._next_wait())
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            now = time.time()
+            while self._due and self._due[0] <= now:
+                heapq.heappop(self._due)
+
+    async def tick(self) -> int:
+        """Claims and runs one batch of due jobs; returns how many were claimed."""
+        now = self._utcnow()
+        due = {"due_at": {"$lte": now}, "lease_until": {"$lte": now}, "attempts": {"$lt": self.max_attempts}}
+        candidates = await scheduled_jobs_db.find(
+            due, projection={"_id": 1}, sort={"sort_key": "due_at"}, limit=self.batch_size
+        )
+        if not candidates:
+            return 0
+        token = uuid.uuid4().hex
+        # the lease condition is repeated so a job claimed meanwhile by another worker is skipped
+        claimed = await scheduled_jobs_db.update_many(
+            {"_id": {"$in": [job["_id"] for job in candidates]}, **due},
+            {
+                "$set": {
+                    "lease_owner": self.worker_id,
+                    "lease_token": token,
+                    "lease_until": now + timedelta(seconds=self.lease_seconds),
+                },
+                "$inc": {"attempts": 1},
+            },
+        )
+        if len(candidates) == self.batch_size and self._wakeup is not None:
+            # more may be due: run the next batch without waiting for the poll
+            self._wakeup.set()
+        if not claimed.modified_count:
+            return 0
+
+        jobs = await scheduled_jobs_db.find({"lease_token": token}, projection={"_id": 1, "name": 1, "kwargs": 1, "attempts": 1})
+        renewer = asyncio.create_task(self._renew_lease(token))
+        try:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+            results = await asyncio.gather(*(self._execute(job, semaphore) for job in jobs))
+        finally:
+            renewer.cancel()
+        finished = [job["_id"] for job, done in zip(jobs, results) if done or job["attempts"] >= self.max_attempts]
+        if finished:
+            await scheduled_jobs_db.delete_many({"_id": {"$in": finished}})
+        return len(jobs)
+
+    async def _renew_lease(self, token: str):
+        """Extends the batch's lease every third of its length while the batch runs."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                await scheduled_jobs_db.update_many(
+                    {"lease_token": token},
+                    {"$set": {"lease_until": self._utcnow() + timedelta(seconds=self.lease_seconds)}},
+                )
+            except Exception as exc:
+                logging.error(f"error occured renewing scheduler lease {exc}")
+
+    async def _execute(self, job: dict, semaphore: asyncio.Semaphore) -> bool:
+        handler = self._handlers.get(job["name"])
+        if handler is None:
+            logging.error(f"no handler registered for scheduled job {job['name']}")
+            return False
+        async with semaphore:
+            try:
+                await handler(**job["kwargs"])
+                return True
+            except Exception as exc:
+                logging.error(f"error occured in scheduled job {job['name']} attempt {job['attempts']}: {exc}")
+                return False
+
+
+scheduler = JobScheduler(
+    lease_seconds=Config.SCHEDULER_LEASE_SECONDS,
+    poll_interval=Config.SCHEDULER_POLL_INTERVAL_SECONDS,
+    max_attempts=Config.SCHEDULER_MAX_ATTEMPTS,
+    max_concurrency=Config.SCHEDULER_MAX_CONCURRENCY,
+    batch_size=Config.SCHEDULER_BATCH_SIZE,
+)
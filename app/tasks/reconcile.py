@@ -0,0 +1,25 @@
+"""
+Rebuilds the per-user task status counters behind /tasks/stats from an
+aggregation over the Tasks collection. Also available as the
+`app.celery_task.task.reconcile_task_stats` Celery task.
+
+    python -m app.tasks.reconcile
+"""
+import asyncio
+import logging
+
+from app.database.asyncdb import core as mongo
+from app.tasks.service import TaskService
+
+
+async def main():
+    mongo.connect()
+    try:
+        users = await TaskService.reconcile_stats()
+        logging.warning(f"reconciled task status counters for {users} users")
+    finally:
+        mongo.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
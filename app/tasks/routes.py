@@ -1,32 +1,49 @@
+import hashlib
 import logging
-from fastapi import APIRouter, HTTPException, status, Depends,Path, BackgroundTasks
+from typing import Optional
+from fastapi import APIRouter, HTTPException, status, Depends, Header, Path, Query, Response
+from fastapi.responses import StreamingResponse
+from bson import ObjectId
 
 from app.celery_task.task import task_update
+from app.core.config import Config
+from app.core.rate_limit import task_write_rate_limit
 from app.core.dependencies import get_current_user, get_manager, is_admin_user
-from app.tasks.schemas import TaskCreateModel, TaskUpdateModel
+from app.core.responses import ORJSONResponse, dumps
+from app.tasks.schemas import (
+    TaskBulkCreateModel,
+    TaskBulkDeleteModel,
+    TaskBulkUpdateModel,
+    TaskCreateModel,
+    TaskListResponse,
+    TaskSortKey,
+    TaskStatsResponse,
+    TaskStatus,
+    SortOrder,
+    TaskUpdateModel,
+)
+from app.scheduler.scheduler import scheduler
 from app.tasks.service import TaskService
 
 router = APIRouter()
 
-@router.post("/create", status_code=201)
+@router.post("/create", status_code=201, dependencies=[Depends(task_write_rate_limit.by_user)])
 async def create_task(
     task_payload: TaskCreateModel,
-    background_tasks: BackgroundTasks,
     current_user=Depends(get_current_user),
 ):
     """
-    API to create a new task for the logged-in user and trigger background processing.
+    API to create a new task for the logged-in user and schedule its completion.
 
     Args:
         task_payload (TaskCreateModel): Task data containing fields like:
             - title (str)
             - description (str)
             - due_date (optional, datetime)
-        background_tasks (BackgroundTasks): FastAPI background task manager used to run async tasks.
         current_user (dict, optional): Logged-in user information injected by dependency. Defaults to Depends(get_current_user).
 
     Raises:
-        HTTPException: 500 Internal Server Error if task creation or background processing fails.
+        HTTPException: 500 Internal Server Error if task creation or scheduling fails.
 
     Returns:
         dict: JSON response containing:
@@ -46,16 +63,18 @@ async def create_task(
             current_user,
         )
 
-        # Run async background processing
-        background_tasks.add_task(
-            TaskService.task_update,
-            task_id,
-            current_user.get("sub")
+        # Persist the delayed completion; it survives restarts and deploys
+        await scheduler.schedule(
+            "task_update",
+            Config.TASK_COMPLETION_DELAY_SECONDS,
+            task_id=task_id,
+            user_id=current_user.get("sub"),
         )
-        # Use celery if fast api background worker is not needed
-        # task_id = str(task_id)
-        # task_update.delay( task_id,
-        #     current_user.get("sub"))
+        # Use celery if the job scheduler is not needed
+        # task_update.apply_async(
+        #     (str(task_id), current_user.get("sub")),
+        #     countdown=Config.TASK_COMPLETION_DELAY_SECONDS,
+        # )
 
         return {
             "message": "Task created successfully",
@@ -72,27 +91,55 @@ async def create_task(
 
 
 
-@router.put("/update/{task_id}")
-async def update_task(task_payload:TaskUpdateModel,task_id: str = Path(...),current_user=Depends(get_current_user)):
+def _parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """Reads the expected task version from an If-Match header such as `"3"` or `W/"3"`; `*` matches any."""
+    if if_match is None or if_match.strip() == "*":
+        return None
+    value = if_match.strip().removeprefix("W/").strip('"')
+    if not value.isdigit():
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="If-Match must be a task version")
+    return int(value)
+
+
+@router.put(
+    "/update/{task_id}",
+    responses={412: {"description": "The task's version does not match If-Match"}},
+    dependencies=[Depends(task_write_rate_limit.by_user)],
+)
+async def update_task(
+    task_payload: TaskUpdateModel,
+    response: Response,
+    task_id: str = Path(...),
+    if_match: Optional[str] = Header(None),
+    current_user=Depends(get_current_user),
+):
     """
-    API to update an existing task for the logged-in user.
+    API to update an existing task for the logged-in user. Only the fields
+    present in the payload are changed.
 
     Args:
-        task_payload (TaskUpdateModel): _description_
-        task_id (str, optional): _description_. Defaults to Path(...).
-        current_user (_type_, optional): _description_. Defaults to Depends(get_current_user).
+        task_payload (TaskUpdateModel): Fields to change; omitted or null fields are left as they are.
+        task_id (str, optional): ID of the task to update. Defaults to Path(...).
+        if_match (str, optional): Expected task version (the `ETag` of the last read or update).
+        current_user (dict, optional): Logged-in user information. Defaults to Depends(get_current_user).
 
     Raises:
-        HTTPException: 404 Not Found if the task does not exist.
-        HTTPException: 403 Forbidden if the user is not authorized to update the task.
+        HTTPException: 404 Not Found if the user has no such task.
+        HTTPException: 412 Precondition Failed if the task changed since the version in If-Match.
+        HTTPException: 403 Forbidden if the new title is already used by another task.
         HTTPException: 500 Internal Server Error for unexpected errors.
 
     Returns:
-        dict: A success message and the updated task details.
+        dict: A success message and the updated task details. The new
+            version is also sent as the `ETag` header.
     """
     try:
         await TaskService.parse_object_id(task_id)
-        updated_task = await TaskService.update_task(task_payload.dict(),current_user,task_id)
+        updated_task = await TaskService.update_task(
+            task_payload.model_dump(), current_user, task_id, expected_version=_parse_if_match(if_match)
+        )
+        if "version" in updated_task:
+            response.headers["ETag"] = f'"{updated_task["version"]}"'
         return {"message": "Task updated successfully", "task_details": updated_task}
     except HTTPException:   # Let HTTPExceptions propagate
         raise
@@ -103,7 +150,7 @@ async def update_task(task_payload:TaskUpdateModel,task_id: str = Path(...),curr
             detail="An internal server error occurred"
         ) from exc
 
-@router.delete("/delete/{task_id}")
+@router.delete("/delete/{task_id}", dependencies=[Depends(task_write_rate_limit.by_user)])
 async def delete_task(task_id: str = Path(...),current_user=Depends(get_current_user)):
     """API to delete a task for the logged-in user.
 
@@ -132,29 +179,225 @@ async def delete_task(task_id: str = Path(...),current_user=Depends(get_current_
             detail="An internal server error occurred"
         ) from exc
 
-@router.get("/user/tasks")
-async def get_user_tasks(current_user=Depends(get_current_user)):
-    """API to retrieve all tasks for the logged-in user.
+@router.post("/bulk", status_code=201)
+async def create_tasks_bulk(
+    payload: TaskBulkCreateModel,
+    current_user=Depends(get_current_user),
+):
+    """
+    API to create many tasks for the logged-in user in one request.
 
     Args:
+        payload (TaskBulkCreateModel): Up to 1000 tasks, each like TaskCreateModel.
         current_user (dict, optional): Logged-in user information. Defaults to Depends(get_current_user).
 
     Raises:
-        HTTPException: 404 Not Found if the user has no tasks.
+        HTTPException: 429 Too Many Requests if the items exceed the user's write limit.
         HTTPException: 500 Internal Server Error for unexpected errors.
 
     Returns:
-        _type_: _description_
+        dict: One result per task, in request order.
+            Example:
+            {
+                "results": [
+                    {"index": 0, "status": "created", "task_id": "694fb66fbd0312fac1d49c8b"},
+                    {"index": 1, "status": "error", "detail": "Task already exists"}
+                ]
+            }
+    """
+    # one token per item, so a bulk request cannot sidestep the per-user write limit
+    await task_write_rate_limit.check(current_user.get("sub"), cost=len(payload.tasks))
+    try:
+        results = await TaskService.create_tasks(
+            [task.model_dump() for task in payload.tasks],
+            current_user,
+        )
+        created = [ObjectId(result["task_id"]) for result in results if result["status"] == "created"]
+        if created:
+            # one job completes the whole batch
+            await scheduler.schedule(
+                "tasks_update",
+                Config.TASK_COMPLETION_DELAY_SECONDS,
+                task_ids=created,
+                user_id=current_user.get("sub"),
+            )
+        return {"results": results}
+    except HTTPException:   # Let HTTPExceptions propagate
+        raise
+    except Exception as exc:
+        logging.error(f"Error in create_tasks_bulk: {exc}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An internal server error occurred"
+        ) from exc
+
+
+@router.put("/bulk")
+async def update_tasks_bulk(payload: TaskBulkUpdateModel, current_user=Depends(get_current_user)):
+    """
+    API to update many tasks of the logged-in user in one request.
+
+    Args:
+        payload (TaskBulkUpdateModel): Up to 1000 items with the task `id` and the fields to change.
+        current_user (dict, optional): Logged-in user information. Defaults to Depends(get_current_user).
+
+    Raises:
+        HTTPException: 429 Too Many Requests if the items exceed the user's write limit.
+        HTTPException: 500 Internal Server Error for unexpected errors.
+
+    Returns:
+        dict: One result per item in request order: "updated", "error" with a detail, or
+            "conflict" if the task changed status while the request was applied.
+    """
+    # one token per item, so a bulk request cannot sidestep the per-user write limit
+    await task_write_rate_limit.check(current_user.get("sub"), cost=len(payload.tasks))
+    try:
+        results = await TaskService.update_tasks(
+            [task.model_dump() for task in payload.tasks],
+            current_user,
+        )
+        return {"results": results}
+    except HTTPException:   # Let HTTPExceptions propagate
+        raise
+    except Exception as exc:
+        logging.error(f"Error in update_tasks_bulk: {exc}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An internal server error occurred"
+        ) from exc
+
+
+@router.delete("/bulk")
+async def delete_tasks_bulk(payload: TaskBulkDeleteModel, current_user=Depends(get_current_user)):
+    """
+    API to delete many tasks of the logged-in user in one request.
+
+    Args:
+        payload (TaskBulkDeleteModel): Up to 1000 task ids.
+        current_user (dict, optional): Logged-in user information. Defaults to Depends(get_current_user).
+
+    Raises:
+        HTTPException: 429 Too Many Requests if the items exceed the user's write limit.
+        HTTPException: 500 Internal Server Error for unexpected errors.
+
+    Returns:
+        dict: One result per id in request order: "deleted", "error" with a detail, or
+            "conflict" if the task changed status while the request was applied.
+    """
+    # one token per item, so a bulk request cannot sidestep the per-user write limit
+    await task_write_rate_limit.check(current_user.get("sub"), cost=len(payload.task_ids))
+    try:
+        results = await TaskService.delete_tasks(payload.task_ids, current_user)
+        return {"results": results}
+    except HTTPException:   # Let HTTPExceptions propagate
+        raise
+    except Exception as exc:
+        logging.error(f"Error in delete_tasks_bulk: {exc}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An internal server error occurred"
+        ) from exc
+
+
+def _stream_tasks_response(user_id: str | None = None, **options) -> StreamingResponse:
+    async def ndjson_lines():
+        async for task in TaskService.stream_tasks(user_id, **options):
+            yield dumps(task) + b"\n"
+
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
+
+
+def _list_etag(version: int, **params) -> str:
+    # the same list version serves different pages, so the query is part of the tag
+    digest = hashlib.blake2b(repr(sorted(params.items())).encode(), digest_size=8).hexdigest()
+    return f'W/"{version}-{digest}"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+
+def _list_options(status_filter: Optional[TaskStatus], sort: TaskSortKey, order: SortOrder,
+                  search: Optional[str]) -> dict:
+    return {
+        "status": status_filter.value if status_filter else None,
+        "sort": sort.value,
+        "descending": order == SortOrder.desc,
+        "search": search,
+    }
+
+
+async def _list_tasks_response(user_id: str | None, limit: int, cursor: Optional[str], stream: bool,
+                               if_none_match: Optional[str], **options) -> Response:
+    """
+    Answers a poll with 304 when the list version is unchanged, before any
+    task is read. The version is read before the tasks, so a write racing
+    with this request can only make the ETag older than the body, never newer.
+    """
+    version = await TaskService.list_version(user_id)
+    etag = _list_etag(version, user_id=user_id, limit=limit, cursor=cursor, stream=stream, **options)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_matches(if_none_match, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    if stream:
+        response = _stream_tasks_response(user_id, **options)
+        response.headers.update(headers)
+        return response
+    tasks, next_cursor = await TaskService.get_tasks(user_id, limit=limit, cursor=cursor, **options)
+    return ORJSONResponse({"tasks": tasks, "next_cursor": next_cursor}, headers=headers)
+
+
+@router.get(
+    "/user/tasks",
+    response_model=TaskListResponse,
+    response_class=ORJSONResponse,
+    responses={304: {"description": "The list has not changed since the ETag in If-None-Match"}},
+)
+async def get_user_tasks(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None),
+    stream: bool = Query(False),
+    status_filter: Optional[TaskStatus] = Query(None, alias="status"),
+    sort: TaskSortKey = Query(TaskSortKey.created),
+    order: SortOrder = Query(SortOrder.asc),
+    search: Optional[str] = Query(None, min_length=1, max_length=200),
+    if_none_match: Optional[str] = Header(None),
+    current_user=Depends(get_current_user),
+):
+    """API to retrieve the tasks of the logged-in user, one page at a time.
+
+    Args:
+        limit (int, optional): Maximum number of tasks in the page. Defaults to 100.
+        cursor (str, optional): `next_cursor` value returned by the previous page.
+        stream (bool, optional): Stream every task as NDJSON instead of returning a page.
+        status_filter (TaskStatus, optional): Only tasks with this status (query parameter `status`).
+        sort (TaskSortKey, optional): Order by "created" (default), "title" or "status".
+        order (SortOrder, optional): "asc" (default) or "desc".
+        search (str, optional): Full-text search over title and description.
+        if_none_match (str, optional): `ETag` of a previous response; answered with 304 if nothing changed.
+        current_user (dict, optional): Logged-in user information. Defaults to Depends(get_current_user).
+
+    Raises:
+        HTTPException: 400 Bad Request if the cursor is invalid.
+        HTTPException: 500 Internal Server Error for unexpected errors.
+
+    Returns:
+        dict: The page of tasks and the cursor for the next page (None on the last page).
+            Example:
+            {
+                "tasks": [...],
+                "next_cursor": "aU-2b70DEvrB1JyL"
+            }
     """
     try:
         user_id = current_user.get("sub")
-        tasks = await TaskService.get_tasks(user_id)
-        # Convert ObjectId to string for each task
-        for task in tasks:
-            if "_id" in task:
-                task["id"] = str(task["_id"])
-                del task["_id"]
-        return {"tasks": tasks}
+        return await _list_tasks_response(
+            user_id, limit, cursor, stream, if_none_match,
+            **_list_options(status_filter, sort, order, search),
+        )
     except HTTPException:   # Let HTTPExceptions propagate
         raise
     except Exception as exc:
@@ -165,28 +408,53 @@ async def get_user_tasks(current_user=Depends(get_current_user)):
         ) from exc
 
 ### FOR ADMIN ONLY ###
-@router.get("/all")
-async def get_all_tasks():
-    """API to retrieve all tasks in the system.
+@router.get(
+    "/all",
+    response_model=TaskListResponse,
+    response_class=ORJSONResponse,
+    responses={304: {"description": "No task has changed since the ETag in If-None-Match"}},
+    dependencies=[Depends(is_admin_user)],
+)
+async def get_all_tasks(
+    limit: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = Query(None),
+    stream: bool = Query(False),
+    status_filter: Optional[TaskStatus] = Query(None, alias="status"),
+    sort: TaskSortKey = Query(TaskSortKey.created),
+    order: SortOrder = Query(SortOrder.asc),
+    search: Optional[str] = Query(None, min_length=1, max_length=200),
+    if_none_match: Optional[str] = Header(None),
+):
+    """API to retrieve all tasks in the system, one page at a time.
 
     Args:
-        current_user (dict, optional): Logged-in user information. Defaults to Depends(get_current_user).
-        _ (dict, optional): Admin user information. Defaults to Depends(is_admin_user).
+        limit (int, optional): Maximum number of tasks in the page. Defaults to 100.
+        cursor (str, optional): `next_cursor` value returned by the previous page.
+        stream (bool, optional): Stream every task as NDJSON instead of returning a page.
+        status_filter (TaskStatus, optional): Only tasks with this status (query parameter `status`).
+        sort (TaskSortKey, optional): Order by "created" (default), "title" or "status".
+        order (SortOrder, optional): "asc" (default) or "desc".
+        search (str, optional): Not supported across users; any value is rejected with 400.
+        if_none_match (str, optional): `ETag` of a previous response; answered with 304 if nothing changed.
 
     Raises:
+        HTTPException: 400 Bad Request if the cursor is invalid or `search` is given.
         HTTPException: 403 Forbidden if the user is not authorized to access this resource.
 
     Returns:
-        _type_: _description_
+        dict: The page of tasks and the cursor for the next page (None on the last page).
     """
+    if search:
+        # the text index is prefixed by user_id, so a search needs one user
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="search is only supported on /tasks/user/tasks",
+        )
     try:
-        tasks = await TaskService.get_tasks()
-        # Convert ObjectId to string for each task
-        for task in tasks:
-            if "_id" in task:
-                task["id"] = str(task["_id"])
-                del task["_id"]
-        return {"tasks": tasks}
+        return await _list_tasks_response(
+            None, limit, cursor, stream, if_none_match,
+            **_list_options(status_filter, sort, order, search),
+        )
     except HTTPException:   # Let HTTPExceptions propagate
         raise
     except Exception as exc:
@@ -197,3 +465,44 @@ async def get_all_tasks():
         ) from exc
 
 
+@router.get("/stats", response_model=TaskStatsResponse)
+async def get_task_stats(current_user=Depends(get_current_user)):
+    """API to count the logged-in user's tasks by status.
+
+    The counts are kept up to date by every task write, so this is a single
+    document lookup rather than a scan of the tasks.
+
+    Args:
+        current_user (dict, optional): Logged-in user information. Defaults to Depends(get_current_user).
+
+    Returns:
+        dict: Number of pending, in_progress and completed tasks, and their total.
+    """
+    try:
+        return await TaskService.get_stats(current_user.get("sub"))
+    except Exception as exc:
+        logging.error(f"Error in get_task_stats: {exc}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An internal server error occurred"
+        ) from exc
+
+
+@router.get("/stats/all", response_model=TaskStatsResponse, dependencies=[Depends(is_admin_user)])
+async def get_all_task_stats():
+    """API to count every user's tasks by status (admin only).
+
+    Raises:
+        HTTPException: 403 Forbidden if the user is not an admin.
+
+    Returns:
+        dict: Number of pending, in_progress and completed tasks, and their total.
+    """
+    try:
+        return await TaskService.get_stats()
+    except Exception as exc:
+        logging.error(f"Error in get_all_task_stats: {exc}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="An internal server error occurred"
+        ) from exc
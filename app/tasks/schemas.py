@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, field_validator
-from typing import Optional
+from typing import List, Optional
 from enum import Enum
 
 class TaskStatus(str, Enum):
@@ -8,6 +8,17 @@ class TaskStatus(str, Enum):
     completed = "completed"
 
 
+class TaskSortKey(str, Enum):
+    created = "created"
+    title = "title"
+    status = "status"
+
+
+class SortOrder(str, Enum):
+    asc = "asc"
+    desc = "desc"
+
+
 class TaskCreateModel(BaseModel):
     title: str = Field(..., min_length=1)
     description: str
@@ -24,3 +35,43 @@ class TaskUpdateModel(BaseModel):
     title: Optional[str] = Field(None, min_length=1)
     description: Optional[str] = None
     status: Optional[TaskStatus] = None
+
+
+MAX_BULK_TASKS = 1000
+
+
+class TaskBulkCreateModel(BaseModel):
+    tasks: List[TaskCreateModel] = Field(..., min_length=1, max_length=MAX_BULK_TASKS)
+
+
+class TaskBulkUpdateItem(TaskUpdateModel):
+    id: str
+
+
+class TaskBulkUpdateModel(BaseModel):
+    tasks: List[TaskBulkUpdateItem] = Field(..., min_length=1, max_length=MAX_BULK_TASKS)
+
+
+class TaskBulkDeleteModel(BaseModel):
+    task_ids: List[str] = Field(..., min_length=1, max_length=MAX_BULK_TASKS)
+
+
+class TaskResponse(BaseModel):
+    id: str
+    title: str
+    description: str
+    status: TaskStatus
+    created_at: str
+    version: int = 0
+
+
+class TaskListResponse(BaseModel):
+    tasks: List[TaskResponse]
+    next_cursor: Optional[str] = None
+
+
+class TaskStatsResponse(BaseModel):
+    pending: int
+    in_progress: int
+    completed: int
+    total: int
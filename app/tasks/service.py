@@ -1,50 +1,224 @@
+import asyncio
 import logging
 from fastapi import Depends, HTTPException,status,BackgroundTasks
-from app.database.asyncdb.models import Users,Tasks
+from app.core.config import Config
+from app.core.metrics import track_task_update
+from app.database.asyncdb.models import task_user_meta_db, tasks_db
 from datetime import datetime, timezone
 from bson import ObjectId
-import asyncio
+from pymongo import ASCENDING, DESCENDING, ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+import base64
+import bson
+from collections import Counter
+from typing import Any, AsyncIterator
 
+from app.scheduler.scheduler import scheduler
 from app.websockets.manager import manager
 
+DUPLICATE_KEY_ERROR = 11000
+# $project stage shaping tasks exactly like TaskResponse, so the server
+# renames _id and no per-document work is left for Python
+TASK_RESPONSE_PROJECTION = {
+    "_id": 0,
+    "id": {"$toString": "$_id"},
+    "title": 1,
+    "description": 1,
+    "status": 1,
+    "created_at": 1,
+    "version": 1,
+}
+
+# list sort keys -> task fields; _id order is creation order
+TASK_SORT_FIELDS = {"created": "_id", "title": "title", "status": "status"}
+
+# TaskUserMeta document that once held the all-tasks version and counters.
+# No longer written (it was a global write hotspot); the all-tasks figures
+# are summed over the per-user documents, leaving it out.
+ALL_TASKS_META_ID = "__all__"
+
+TASK_DETAIL_PROJECTION = {"_id": 0, "title": 1, "description": 1, "status": 1, "created_at": 1, "version": 1}
+
+TASK_STATUSES = ("pending", "in_progress", "completed")
+
+
+def _status_value(value) -> str:
+    # payload statuses arrive as TaskStatus members
+    return getattr(value, "value", value)
 
 
 class TaskService:
+    @staticmethod
+    async def bump_list_version(user_id: str, status_deltas: dict | None = None):
+        """
+        Bumps the user's list version and applies `status_deltas`
+        ({status: +n/-n}) to the user's status counters, with one upsert.
+        Called after the write it accounts for, so a reader never pairs a
+        new version with old data.
+        """
+        update = {"version": 1}
+        for task_status, delta in (status_deltas or {}).items():
+            if task_status and delta:
+                key = f"counts.{_status_value(task_status)}"
+                update[key] = update.get(key, 0) + delta
+        try:
+            await task_user_meta_db.update_one({"_id": user_id}, {"$inc": update}, upsert=True)
+        except Exception as exc:
+            logging.error(f'error occured in bump list version function {exc}')
+
+    @staticmethod
+    async def _sum_user_meta(fields: dict) -> dict:
+        """Sums per-user TaskUserMeta fields ({name: "$path"}) over every user."""
+        totals = await task_user_meta_db.aggregate([
+            {"$match": {"_id": {"$ne": ALL_TASKS_META_ID}}},
+            {"$group": {"_id": None, **{name: {"$sum": path} for name, path in fields.items()}}},
+        ])
+        return totals[0] if totals else {}
+
+    @staticmethod
+    async def get_stats(user_id: str | None = None) -> dict:
+        """
+        Task counts by status for the user (one point lookup), or for everyone
+        when user_id is None (a $group over the per-user counters).
+        """
+        if user_id is None:
+            counts = await TaskService._sum_user_meta({task_status: f"$counts.{task_status}" for task_status in TASK_STATUSES})
+        else:
+            meta = await task_user_meta_db.find_one({"_id": user_id}, projection={"counts": 1})
+            counts = (meta or {}).get("counts", {})
+        if any(counts.get(task_status, 0) < 0 for task_status in TASK_STATUSES):
+            logging.warning(f"negative task counters for {user_id or 'all users'}: {counts}, run app.tasks.reconcile")
+        stats = {task_status: max(counts.get(task_status, 0), 0) for task_status in TASK_STATUSES}
+        stats["total"] = sum(stats.values())
+        return stats
+
+    @staticmethod
+    async def reconcile_stats() -> int:
+        """
+        Rebuilds every status counter from an aggregation over Tasks, fixing
+        any drift (e.g. from writes made outside TaskService). Counters of
+        users without tasks are reset to zero. Returns the number of users
+        with tasks.
+
+        Writes that land while it runs can be overwritten, so run it when
+        traffic is low.
+        """
+        per_user = {}
+        async for group in tasks_db.iter_aggregate([
+            {"$group": {"_id": {"user_id": "$user_id", "status": "$status"}, "count": {"$sum": 1}}},
+        ]):
+            user_id, task_status = group["_id"].get("user_id"), group["_id"].get("status")
+            if user_id is None or task_status not in TASK_STATUSES:
+                continue
+            per_user.setdefault(user_id, dict.fromkeys(TASK_STATUSES, 0))[task_status] = group["count"]
+
+        if per_user:
+            await task_user_meta_db.bulk_write([
+                UpdateOne({"_id": user_id}, {"$set": {"counts": counts}}, upsert=True)
+                for user_id, counts in per_user.items()
+            ])
+        await task_user_meta_db.update_many(
+            {"_id": {"$nin": [*per_user, ALL_TASKS_META_ID]}},
+            {"$set": {"counts": dict.fromkeys(TASK_STATUSES, 0)}},
+        )
+        await task_user_meta_db.delete_one({"_id": ALL_TASKS_META_ID})
+        return len(per_user)
+
+    @staticmethod
+    async def list_version(user_id: str | None = None) -> int:
+        """
+        Version of the user's task list, or of all tasks when user_id is None.
+        The all-tasks version is the sum of the per-user versions: every
+        write bumps one of them, so the sum moves whenever any list changes.
+        """
+        if user_id is None:
+            return (await TaskService._sum_user_meta({"version": "$version"})).get("version", 0)
+        meta = await task_user_meta_db.find_one({"_id": user_id}, projection={"version": 1})
+        return meta["version"] if meta else 0
+
     @staticmethod
     async def create_task(task_data: dict, user: dict) -> str:
         try:
-            existing_task = await TaskService.has_task(task_data.get("title"), user.get("sub"))
-            if existing_task:
-                raise HTTPException(
-                    status_code=status.HTTP_403_FORBIDDEN,
-                    detail="Task already exists"
-                )
             user_id = user.get("sub")
-            task_data.update({"user_id": user_id,"created_at": str(datetime.now(timezone.utc))})
-            doc_id =await Tasks().insert_one({**task_data})
+            task_data.update({"user_id": user_id,"created_at": str(datetime.now(timezone.utc)), "version": 1})
+            # the unique (user_id, title) index rejects duplicates, no lookup needed
+            doc_id =await tasks_db.insert_one({**task_data})
             task_id = doc_id.inserted_id
+            await TaskService.bump_list_version(user_id, {_status_value(task_data.get("status", "pending")): 1})
             return task_id
+        except DuplicateKeyError:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Task already exists"
+            )
         except HTTPException as exc:
             raise
         except Exception as exc:
             logging.error(f'error occured in create task function {exc}')
             return {}
     @staticmethod
-    async def update_task(task_data: dict, user:str,task_id:str) -> dict:
+    async def update_task(task_data: dict, user:str,task_id:str, expected_version: int | None = None) -> dict:
+        """
+        Applies the provided (non-None) fields with one find_one_and_update
+        that also checks ownership and, when `expected_version` is given,
+        the task's version. Every update bumps the version. The document is
+        fetched as it was before the update, which gives the old status for
+        the counters; the updated task is derived from it.
+
+        Returns:
+            dict: The task after the update, including its new version.
+
+        Raises:
+            HTTPException: 404 if the user has no such task, 412 if its
+                version is not `expected_version`, 403 if the new title is
+                already taken.
+        """
         try:
             user_id = user.get("sub")
-            existing_task = await TaskService.has_task(task_data.get("title"), user_id,task_id)
-            if not existing_task:
+            query = {"_id": ObjectId(task_id), "user_id": user_id}
+            if expected_version is not None:
+                # tasks created before versioning have no version field and count as 0
+                query["version"] = expected_version if expected_version else {"$in": [0, None]}
+            changes = {key: value for key, value in task_data.items() if value is not None}
+            if changes:
+                previous = await tasks_db.find_one_and_update(
+                    query,
+                    {"$set": changes, "$inc": {"version": 1}},
+                    projection=TASK_DETAIL_PROJECTION,
+                    return_document=ReturnDocument.BEFORE,
+                )
+                updated_details = None
+                if previous is not None:
+                    updated_details = {**previous, **changes, "version": previous.get("version", 0) + 1}
+            else:
+                updated_details = await tasks_db.find_one(query, projection=TASK_DETAIL_PROJECTION)
+            if updated_details is None:
+                # only the failure path pays for telling the two cases apart
+                exists = expected_version is not None and await tasks_db.find_one(
+                    {"_id": query["_id"], "user_id": user_id}, projection={"_id": 1}
+                )
+                if exists:
+                    raise HTTPException(
+                        status_code=status.HTTP_412_PRECONDITION_FAILED,
+                        detail="Task was modified by another request"
+                    )
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="Task not found"
                 )
-            
-            updated_details = await Tasks().find_one_and_update(
-                {"_id": ObjectId(task_id)},
-                {"$set": task_data}
+            if changes:
+                status_deltas = {}
+                old_status, new_status = previous.get("status"), _status_value(updated_details.get("status"))
+                if old_status != new_status:
+                    status_deltas = {old_status: -1, new_status: 1}
+                await TaskService.bump_list_version(user_id, status_deltas)
+            updated_details.setdefault("version", 0)
+            return {"id": task_id, **updated_details}
+        except DuplicateKeyError:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Task already exists"
             )
-            return updated_details
         except HTTPException:   # Let HTTPExceptions propagate
             raise
         except Exception as exc:
@@ -52,19 +226,178 @@ class TaskService:
             return {}
 
     @staticmethod
-    async def has_task(title: str, user_id: str,task_id: str="") -> str:
+    def _bulk_write_errors(exc: BulkWriteError) -> dict:
+        """Maps the index of each failed operation to its write error."""
+        return {error["index"]: error for error in exc.details.get("writeErrors", [])}
+
+    @staticmethod
+    def _bulk_error_detail(error: dict) -> str:
+        if error.get("code") == DUPLICATE_KEY_ERROR:
+            return "Task already exists"
+        return "Write failed"
+
+    @staticmethod
+    async def _owned_task_statuses(task_ids: list, user_id: str) -> dict:
+        """Maps each of the ids that the user owns to the task's current status."""
+        owned = await tasks_db.find(
+            {"_id": {"$in": task_ids}, "user_id": user_id},
+            projection={"_id": 1, "status": 1},
+        )
+        return {task["_id"]: task.get("status") for task in owned}
+
+    @staticmethod
+    async def create_tasks(tasks_data: list, user: dict) -> list:
+        """
+        Inserts all tasks with one unordered insert_many and reports a result
+        per item, in request order.
+        """
+        user_id = user.get("sub")
+        created_at = str(datetime.now(timezone.utc))
+        docs = [{**task_data, "user_id": user_id, "created_at": created_at, "version": 1} for task_data in tasks_data]
+        errors = {}
         try:
-            query_dict = {}
-            if task_id:
-                query_dict.update({"_id":ObjectId(task_id)})
+            # insert_many assigns each document its _id before sending it
+            await tasks_db.insert_many(docs)
+        except BulkWriteError as exc:
+            errors = TaskService._bulk_write_errors(exc)
+        if len(errors) < len(docs):
+            status_deltas = Counter(_status_value(doc.get("status", "pending")) for index, doc in enumerate(docs) if index not in errors)
+            await TaskService.bump_list_version(user_id, status_deltas)
+
+        results = []
+        for index, doc in enumerate(docs):
+            if index in errors:
+                results.append({"index": index, "status": "error", "detail": TaskService._bulk_error_detail(errors[index])})
             else:
-                query_dict.update({"title": title, "user_id": user_id})
-            task = await Tasks().find(query_dict)
-            return task
-        except Exception as exc:
-            logging.error(f'error occured in has task function')
-            return ""
-    
+                results.append({"index": index, "status": "created", "task_id": str(doc["_id"])})
+        return results
+
+    @staticmethod
+    async def update_tasks(tasks_data: list, user: dict) -> list:
+        """
+        Applies the updates after a single lookup that keeps only the tasks
+        owned by the user and reads their status. Every update is filtered
+        on the status it was read with and sent in one unordered bulk_write
+        per (old status, new status) pair, so each write's matched count
+        gives the counter deltas exactly. An update whose task changed
+        status in between (e.g. completed by the scheduler) is not applied
+        and is reported as a conflict.
+        """
+        user_id = user.get("sub")
+        results = [None] * len(tasks_data)
+        task_ids = {}
+        for index, task_data in enumerate(tasks_data):
+            if ObjectId.is_valid(task_data["id"]):
+                task_ids[index] = ObjectId(task_data["id"])
+            else:
+                results[index] = {"index": index, "status": "error", "detail": "Invalid ObjectId"}
+
+        owned = await TaskService._owned_task_statuses(list(task_ids.values()), user_id) if task_ids else {}
+        groups = {}
+        for index, task_id in task_ids.items():
+            if task_id not in owned:
+                results[index] = {"index": index, "status": "error", "detail": "Task not found"}
+                continue
+            results[index] = {"index": index, "status": "updated", "task_id": str(task_id)}
+            changes = {key: value for key, value in tasks_data[index].items() if key != "id" and value is not None}
+            if changes:
+                old_status = owned[task_id]
+                new_status = _status_value(changes.get("status", old_status))
+                groups.setdefault((old_status, new_status), []).append((index, changes))
+
+        if groups:
+            matched = await asyncio.gather(*(
+                TaskService._update_group(user_id, task_ids, old_status, items, results)
+                for (old_status, _), items in groups.items()
+            ))
+            status_deltas = Counter()
+            for (old_status, new_status), count in zip(groups, matched):
+                if old_status != new_status:
+                    status_deltas[old_status] -= count
+                    status_deltas[new_status] += count
+            await TaskService.bump_list_version(user_id, status_deltas)
+        return results
+
+    @staticmethod
+    async def _update_group(user_id: str, task_ids: dict, old_status: str, items: list, results: list) -> int:
+        """
+        Writes the updates of tasks read with `old_status`; returns how many
+        matched. Only when some did not match are the tasks read again to
+        tell the conflicts apart.
+        """
+        requests = [
+            UpdateOne({"_id": task_ids[index], "user_id": user_id, "status": old_status},
+                      {"$set": changes, "$inc": {"version": 1}})
+            for index, changes in items
+        ]
+        errors = {}
+        try:
+            matched = (await tasks_db.bulk_write(requests)).matched_count
+        except BulkWriteError as exc:
+            errors = TaskService._bulk_write_errors(exc)
+            matched = exc.details.get("nMatched", 0)
+        for request_index, error in errors.items():
+            index = items[request_index][0]
+            results[index] = {"index": index, "status": "error", "detail": TaskService._bulk_error_detail(error)}
+
+        if matched < len(requests) - len(errors):
+            pending = [(index, changes) for request_index, (index, changes) in enumerate(items) if request_index not in errors]
+            current = await tasks_db.find(
+                {"_id": {"$in": [task_ids[index] for index, _ in pending]}, "user_id": user_id},
+                projection={"_id": 1, **{key: 1 for _, changes in pending for key in changes}},
+            )
+            current = {task["_id"]: task for task in current}
+            for index, changes in pending:
+                task = current.get(task_ids[index])
+                if task is None:
+                    results[index] = {"index": index, "status": "error", "detail": "Task not found"}
+                elif any(_status_value(task.get(key)) != _status_value(value) for key, value in changes.items()):
+                    results[index] = {"index": index, "status": "conflict", "detail": "Task was modified concurrently"}
+        return matched
+
+    @staticmethod
+    async def delete_tasks(task_ids: list, user: dict) -> list:
+        """
+        Deletes the user's tasks after one lookup of their status, with one
+        delete_many per status filtered on that status, so the deleted
+        counts give the counter deltas exactly. A task whose status changed
+        in between is not deleted and is reported as a conflict; one that
+        was deleted concurrently is reported as deleted.
+        """
+        user_id = user.get("sub")
+        valid_ids = [ObjectId(task_id) for task_id in task_ids if ObjectId.is_valid(task_id)]
+        owned = await TaskService._owned_task_statuses(valid_ids, user_id) if valid_ids else {}
+        by_status = {}
+        for task_id, task_status in owned.items():
+            by_status.setdefault(task_status, []).append(task_id)
+
+        conflicts = set()
+        if by_status:
+            deleted = await asyncio.gather(*(
+                tasks_db.delete_many({"_id": {"$in": ids}, "user_id": user_id, "status": task_status})
+                for task_status, ids in by_status.items()
+            ))
+            status_deltas = {}
+            for (task_status, ids), result in zip(by_status.items(), deleted):
+                status_deltas[task_status] = -result.deleted_count
+                if result.deleted_count < len(ids):
+                    # still there means its status moved on; gone means someone else deleted it
+                    remaining = await tasks_db.find({"_id": {"$in": ids}, "user_id": user_id}, projection={"_id": 1})
+                    conflicts.update(task["_id"] for task in remaining)
+            await TaskService.bump_list_version(user_id, status_deltas)
+
+        results = []
+        for index, task_id in enumerate(task_ids):
+            if not ObjectId.is_valid(task_id):
+                results.append({"index": index, "status": "error", "detail": "Invalid ObjectId"})
+            elif ObjectId(task_id) not in owned:
+                results.append({"index": index, "status": "error", "detail": "Task not found"})
+            elif ObjectId(task_id) in conflicts:
+                results.append({"index": index, "status": "conflict", "detail": "Task was modified concurrently"})
+            else:
+                results.append({"index": index, "status": "deleted", "task_id": task_id})
+        return results
+
     @staticmethod
     async def parse_object_id(id_str: str):
         try:
@@ -78,14 +411,18 @@ class TaskService:
     
     @staticmethod
     async def delete_task(task_id: str, current_user: dict) ->bool:
-        has_task = await Tasks().find_one({"_id": ObjectId(task_id), "user_id": current_user.get("sub")})
         try:
-            if not has_task:
+            # one owner-checked round trip that also returns the status for the counters
+            deleted = await tasks_db.find_one_and_delete(
+                {"_id": ObjectId(task_id), "user_id": current_user.get("sub")},
+                projection={"_id": 0, "status": 1},
+            )
+            if deleted is None:
                 raise HTTPException(
                     status_code=status.HTTP_404_NOT_FOUND,
                     detail="Task not found"
                 )
-            await Tasks().delete_one({"_id": ObjectId(task_id)})
+            await TaskService.bump_list_version(current_user.get("sub"), {deleted.get("status"): -1})
             return True
         except HTTPException:   # Let HTTPExceptions propagate
             raise
@@ -94,33 +431,174 @@ class TaskService:
             return False
     
     @staticmethod
-    async def get_tasks(user_id: str | None = None) ->list:
+    def encode_cursor(task_id: ObjectId, sort_field: str = "_id", value: Any = None) -> str:
+        """
+        Opaque position after the last task of a page: the bare _id for
+        creation order, otherwise (sort field, sort value, _id).
+        """
+        raw = task_id.binary if sort_field == "_id" else bson.encode({"s": sort_field, "v": value, "id": task_id})
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str, sort_field: str = "_id") -> tuple[Any, ObjectId]:
+        """Returns (sort value, _id) to resume after; 400 if the cursor is malformed or from another sort."""
         try:
-            query = {"user_id": user_id} if user_id else {}
-            tasks = await Tasks().find(query,projection={"_id": 1,"title":1,"description":1,"status":1,"created_at":1})
-            if not tasks:
-                return []
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            if sort_field == "_id":
+                task_id = ObjectId(raw)
+                return task_id, task_id
+            position = bson.decode(raw)
+            if position["s"] == sort_field:
+                return position["v"], position["id"]
+        except Exception:
+            pass
+        raise HTTPException(status_code=400, detail="Invalid cursor")
 
-            return tasks
-        except Exception as exc:
-            logging.error(f'error occured in get task function {exc}')
-            return []
+    @staticmethod
+    def task_filter(user_id: str | None = None, status: str | None = None, search: str | None = None) -> dict:
+        query = {}
+        if user_id:
+            query["user_id"] = user_id
+        if status:
+            query["status"] = status
+        if search:
+            # served by the user_id-prefixed text index, which needs user_id by equality
+            query["$text"] = {"$search": search}
+        return query
+
+    @staticmethod
+    def _sort_stage(sort_field: str, descending: bool) -> dict:
+        order = DESCENDING if descending else ASCENDING
+        # _id breaks ties so the order, and therefore the keyset, is total
+        return {"_id": order} if sort_field == "_id" else {sort_field: order, "_id": order}
+
+    @staticmethod
+    async def get_tasks(user_id: str | None = None, limit: int = 100, cursor: str | None = None,
+                        status: str | None = None, sort: str = "created", descending: bool = False,
+                        search: str | None = None) -> tuple[list, str | None]:
+        """
+        Returns one page of tasks and the opaque cursor for the next page, or
+        None when there are no more tasks. Filtering, text search and
+        ordering all happen in MongoDB; pages are keyset-paginated on
+        (sort value, _id).
 
+        Args:
+            user_id (str, optional): Owner to list; None lists every task.
+            limit (int): Maximum number of tasks in the page.
+            cursor (str, optional): `next_cursor` of the previous page, for the same sort.
+            status (str, optional): Only tasks with this status.
+            sort (str): "created", "title" or "status".
+            descending (bool): Reverse the order.
+            search (str, optional): Text search over title and description.
+
+        Raises:
+            HTTPException: 400 if the cursor is invalid. Database errors
+                propagate, so a failed read is never answered as an empty page.
+        """
+        sort_field = TASK_SORT_FIELDS[sort]
+        query = TaskService.task_filter(user_id, status, search)
+        if cursor:
+            value, after_id = TaskService.decode_cursor(cursor, sort_field)
+            op = "$lt" if descending else "$gt"
+            if sort_field == "_id":
+                query["_id"] = {op: after_id}
+            else:
+                query["$or"] = [{sort_field: {op: value}}, {sort_field: value, "_id": {op: after_id}}]
+        # one extra document tells us whether there is a next page. Not read
+        # through the query cache: the page goes out under an ETag from the
+        # current list version, so it must never be older than that version.
+        tasks = await tasks_db.aggregate([
+            {"$match": query},
+            {"$sort": TaskService._sort_stage(sort_field, descending)},
+            {"$limit": limit + 1},
+            {"$project": TASK_RESPONSE_PROJECTION},
+        ])
+        next_cursor = None
+        if len(tasks) > limit:
+            tasks = tasks[:limit]
+            last = tasks[-1]
+            next_cursor = TaskService.encode_cursor(ObjectId(last["id"]), sort_field, last.get(sort_field))
+        return tasks, next_cursor
+
+    @staticmethod
+    async def stream_tasks(user_id: str | None = None, status: str | None = None, sort: str = "created",
+                           descending: bool = False, search: str | None = None) -> AsyncIterator[dict]:
+        """
+        Yields every matching task for the user (or all tasks), already
+        shaped like TaskResponse, without materialising the full result set
+        in memory.
+        """
+        pipeline = [
+            {"$match": TaskService.task_filter(user_id, status, search)},
+            {"$sort": TaskService._sort_stage(TASK_SORT_FIELDS[sort], descending)},
+            {"$project": TASK_RESPONSE_PROJECTION},
+        ]
+        async for task in tasks_db.iter_aggregate(pipeline):
+            yield task
+
+    @staticmethod
+    async def tasks_update(task_ids: list, user_id: str):
+        """
+        Bulk counterpart of task_update: completes the tasks with one
+        update_many per open status, whose modified counts feed the
+        counters, and notifies the user once per task.
+        """
+        status_deltas = Counter()
+        for open_status in ("pending", "in_progress"):
+            result = await tasks_db.update_many(
+                {"_id": {"$in": task_ids}, "status": open_status},
+                {"$set": {"status": "completed"}, "$inc": {"version": 1}},
+            )
+            status_deltas[open_status] -= result.modified_count
+            status_deltas["completed"] += result.modified_count
+        if status_deltas["completed"]:
+            await TaskService.bump_list_version(user_id, status_deltas)
+        if Config.TASK_CHANGE_STREAM_ENABLED:
+            # the change stream watcher pushes the update
+            return
+        for task_id in task_ids:
+            await manager.send_to_user(
+                user_id,
+                {"type": "task.completed", "task_id": str(task_id)}
+            )
     
     @staticmethod
     async def task_update(task_id,user_id):
         """
-        TO UPDATE TASK
+        TO UPDATE TASK. Runs once the completion delay has passed, from the
+        job scheduler or the Celery worker.
 
         Args:
-            task_id (_type_): _description_
-            user_id (_type_): _description_
+            task_id (ObjectId): Task to mark as completed.
+            user_id (str): Owner of the task, notified over WebSocket.
         """
-        await asyncio.sleep(10)
-        await Tasks().update_one({"_id":task_id},{"$set":{"status":"completed"}})
+        previous = await tasks_db.find_one_and_update(
+            {"_id": task_id, "status": {"$ne": "completed"}},
+            {"$set": {"status": "completed"}, "$inc": {"version": 1}},
+            projection={"_id": 0, "status": 1},
+        )
+        if previous is None:
+            # deleted, or already completed: nothing changed
+            return
+        await TaskService.bump_list_version(user_id, {previous.get("status"): -1, "completed": 1})
+        if Config.TASK_CHANGE_STREAM_ENABLED:
+            # the change stream watcher pushes the update
+            return
         await manager.send_to_user(
         user_id,
-        f"Task {task_id} completed"
+        {"type": "task.completed", "task_id": str(task_id)}
     )
 
 
+async def _scheduled_task_update(**kwargs):
+    with track_task_update("scheduler"):
+        await TaskService.task_update(**kwargs)
+
+
+async def _scheduled_tasks_update(**kwargs):
+    with track_task_update("scheduler"):
+        await TaskService.tasks_update(**kwargs)
+
+
+scheduler.register("task_update", _scheduled_task_update)
+scheduler.register("tasks_update", _scheduled_tasks_update)
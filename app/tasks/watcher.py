@@ -0,0 +1,149 @@
+import asyncio
+import logging
+import time
+from typing import Callable, Optional
+
+from motor.motor_asyncio import AsyncIOMotorCollection
+from pymongo.errors import OperationFailure
+
+from app.database.asyncdb.collections import tasks_collection
+from app.database.asyncdb.models import change_stream_tokens_db
+from app.websockets.manager import ConnectionManager
+
+# ChangeStreamHistoryLost: the saved resume token fell off the oplog
+CHANGE_STREAM_HISTORY_LOST = 286
+
+TASK_EVENT_FIELDS = ("title", "description", "status", "created_at", "version")
+
+
+def _task_delta(document: dict) -> dict:
+    task = {field: document[field] for field in TASK_EVENT_FIELDS if field in document}
+    task["id"] = str(document["_id"])
+    return task
+
+
+def change_to_event(change: dict) -> tuple[Optional[str], Optional[dict]]:
+    """
+    Turns a Tasks change event into (user_id, compact delta event). Updates
+    carry only the changed and removed fields; deletes are routed with the
+    pre-image, so they need changeStreamPreAndPostImages on the collection.
+    """
+    operation = change.get("operationType")
+    document = change.get("fullDocument") or change.get("fullDocumentBeforeChange") or {}
+    user_id = document.get("user_id")
+    task_id = str(change.get("documentKey", {}).get("_id"))
+    if operation == "insert":
+        return user_id, {"type": "task.created", "task": _task_delta(change["fullDocument"])}
+    if operation == "update":
+        description = change.get("updateDescription", {})
+        return user_id, {
+            "type": "task.updated",
+            "task_id": task_id,
+            "fields": description.get("updatedFields", {}),
+            "removed": description.get("removedFields", []),
+        }
+    if operation == "replace":
+        return user_id, {"type": "task.updated", "task_id": task_id, "fields": _task_delta(change["fullDocument"]), "removed": []}
+    if operation == "delete":
+        return user_id, {"type": "task.deleted", "task_id": task_id}
+    return None, None
+
+
+class TaskChangeWatcher:
+    """
+    Watches the Tasks collection and pushes every insert, update and delete
+    (whatever wrote it) to the owner's local WebSocket connections. Each web
+    process runs one watcher, so events are delivered locally rather than
+    re-broadcast. The resume token is checkpointed so a restarted process
+    continues where the stream left off.
+
+    `collection_factory` returns the collection to watch; tests can pass an
+    in-process fake exposing `watch()`.
+    """
+
+    RECONNECT_DELAY = 1.0
+
+    def __init__(self, manager: ConnectionManager, stream_name: str = "tasks",
+                 checkpoint_interval: float = 1.0,
+                 collection_factory: Callable[[], AsyncIOMotorCollection] = tasks_collection):
+        self.manager = manager
+        self.stream_name = stream_name
+        self.checkpoint_interval = checkpoint_interval
+        self.collection_factory = collection_factory
+        self._runner: Optional[asyncio.Task] = None
+        self._resume_token: Optional[dict] = None
+        self._saved_token: Optional[dict] = None
+        self._last_checkpoint = 0.0
+
+    async def start(self):
+        if self._runner is None:
+            self._runner = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._runner is not None:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+            await self._checkpoint(force=True)
+
+    async def enable_pre_images(self):
+        collection = self.collection_factory()
+        try:
+            await collection.database.command(
+                "collMod", collection.name, changeStreamPreAndPostImages={"enabled": True}
+            )
+        except Exception as exc:
+            logging.warning(f"could not enable change stream pre-images, deletes will not be pushed: {exc}")
+
+    async def _load_token(self) -> Optional[dict]:
+        saved = await change_stream_tokens_db.find_one({"_id": self.stream_name}, projection={"token": 1})
+        return saved["token"] if saved else None
+
+    async def _checkpoint(self, force: bool = False):
+        if self._resume_token is None or self._resume_token == self._saved_token:
+            return
+        if not force and time.monotonic() - self._last_checkpoint < self.checkpoint_interval:
+            return
+        try:
+            await change_stream_tokens_db.update_one(
+                {"_id": self.stream_name}, {"$set": {"token": self._resume_token}}, upsert=True
+            )
+            self._saved_token = self._resume_token
+            self._last_checkpoint = time.monotonic()
+        except Exception as exc:
+            logging.error(f"error saving change stream resume token: {exc}")
+
+    async def handle(self, change: dict):
+        user_id, event = change_to_event(change)
+        if user_id and event:
+            await self.manager.deliver_local([user_id], event)
+
+    async def _run(self):
+        await self.enable_pre_images()
+        self._resume_token = self._saved_token = await self._load_token()
+        while True:
+            try:
+                async with self.collection_factory().watch(
+                    full_document="updateLookup",
+                    full_document_before_change="whenAvailable",
+                    resume_after=self._resume_token,
+                ) as stream:
+                    async for change in stream:
+                        await self.handle(change)
+                        self._resume_token = stream.resume_token
+                        await self._checkpoint()
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as exc:
+                if exc.code == CHANGE_STREAM_HISTORY_LOST:
+                    logging.error("change stream resume token expired, restarting from now")
+                    self._resume_token = None
+                else:
+                    logging.error(f"task change stream failed, reconnecting: {exc}")
+                await asyncio.sleep(self.RECONNECT_DELAY)
+            except Exception as exc:
+                logging.error(f"task change stream failed, reconnecting: {exc}")
+                await asyncio.sleep(self.RECONNECT_DELAY)
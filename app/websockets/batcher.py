@@ -0,0 +1,56 @@
+import asyncio
+import json
+from typing import List
+
+import msgpack
+
+MSGPACK_SUBPROTOCOL = "msgpack"
+JSON_SUBPROTOCOL = "json"
+
+
+class EventBatcher:
+    """
+    Coalesces queued events into one frame. After the first event arrives it
+    keeps collecting for up to `window` seconds or until `max_events` events,
+    whichever comes first.
+    """
+
+    def __init__(self, window: float, max_events: int):
+        self.window = window
+        self.max_events = max_events
+
+    async def next_batch(self, queue: asyncio.Queue) -> List[dict]:
+        batch = [await queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.window
+        while len(batch) < self.max_events:
+            try:
+                batch.append(queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+
+def negotiate_subprotocol(offered: List[str]) -> str | None:
+    """Picks msgpack when the client offers it, else json if offered."""
+    if MSGPACK_SUBPROTOCOL in offered:
+        return MSGPACK_SUBPROTOCOL
+    if JSON_SUBPROTOCOL in offered:
+        return JSON_SUBPROTOCOL
+    return None
+
+
+def encode_json(batch: List[dict]) -> str:
+    return json.dumps(batch, separators=(",", ":"), default=str)
+
+
+def encode_msgpack(batch: List[dict]) -> bytes:
+    return msgpack.packb(batch, default=str)
@@ -0,0 +1,129 @@
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, List, Optional
+
+import redis.asyncio as aioredis
+
+from app.core.config import Config
+
+DeliverHandler = Callable[[List[str], dict], Awaitable[None]]
+
+
+class BroadcastBackend(ABC):
+    """
+    Carries events from whichever process produced them to the process
+    holding the user's WebSocket. Every web process subscribes with a handler
+    that delivers to its own local connections.
+    """
+
+    @abstractmethod
+    async def publish(self, user_ids: List[str], event: dict):
+        """Sends `event` to the connections of `user_ids` in every subscribed process."""
+
+    @abstractmethod
+    async def subscribe(self, handler: DeliverHandler):
+        """Calls `handler(user_ids, event)` for every event published from now on."""
+
+    async def close(self):
+        pass
+
+
+class InMemoryBroadcast(BroadcastBackend):
+    """Single-process backend: an event is delivered straight to the local handler."""
+
+    def __init__(self):
+        self._handler: Optional[DeliverHandler] = None
+
+    async def publish(self, user_ids: List[str], event: dict):
+        if self._handler is not None:
+            await self._handler(user_ids, event)
+
+    async def subscribe(self, handler: DeliverHandler):
+        self._handler = handler
+
+    async def close(self):
+        self._handler = None
+
+
+class RedisBroadcast(BroadcastBackend):
+    """
+    Redis pub/sub backend. Publishers (web processes and Celery workers) send
+    to one channel; each subscribed web process runs a single listener task
+    that routes events to its local sockets.
+
+    `client_factory` builds the redis client and can be swapped for a local
+    stand-in such as fakeredis in tests.
+    """
+
+    RECONNECT_DELAY = 1.0
+
+    def __init__(self, url: str, channel: str, client_factory: Optional[Callable[[str], aioredis.Redis]] = None):
+        self.url = url
+        self.channel = channel
+        self.client_factory = client_factory or aioredis.Redis.from_url
+        self._client: Optional[aioredis.Redis] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._listener: Optional[asyncio.Task] = None
+
+    def _get_client(self) -> aioredis.Redis:
+        # redis.asyncio connections are bound to the loop that opened them
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client_loop is not loop:
+            self._client = self.client_factory(self.url)
+            self._client_loop = loop
+        return self._client
+
+    async def publish(self, user_ids: List[str], event: dict):
+        payload = json.dumps({"user_ids": user_ids, "event": event}, default=str)
+        await self._get_client().publish(self.channel, payload)
+
+    async def subscribe(self, handler: DeliverHandler):
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen(handler))
+
+    async def _listen(self, handler: DeliverHandler):
+        while True:
+            pubsub = self._get_client().pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                async for item in pubsub.listen():
+                    if item.get("type") != "message":
+                        continue
+                    try:
+                        data = json.loads(item["data"])
+                        await handler(data["user_ids"], data["event"])
+                    except Exception as exc:
+                        logging.error(f"error delivering broadcast event: {exc}")
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logging.error(f"redis broadcast listener failed, reconnecting: {exc}")
+                await asyncio.sleep(self.RECONNECT_DELAY)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    async def close(self):
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def create_broadcast_backend() -> BroadcastBackend:
+    if Config.WEBSOCKET_BROADCAST_BACKEND == "redis":
+        return RedisBroadcast(
+            url=Config.WEBSOCKET_BROADCAST_URL or Config.BROKER_URL,
+            channel=Config.WEBSOCKET_BROADCAST_CHANNEL,
+        )
+    return InMemoryBroadcast()
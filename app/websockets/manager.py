@@ -1,21 +1,143 @@
+import asyncio
+import logging
+
 from fastapi import WebSocket
-from typing import Dict
+from typing import Dict, Iterable, Optional
+
+from app.core.config import Config
+from app.websockets.batcher import (
+    MSGPACK_SUBPROTOCOL,
+    EventBatcher,
+    encode_json,
+    encode_msgpack,
+    negotiate_subprotocol,
+)
+from app.websockets.broadcast import BroadcastBackend, create_broadcast_backend
+
+# "Try Again Later": the client could not keep up and should reconnect
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+
+class Connection:
+    """
+    One WebSocket with its own bounded outbound queue, drained by a dedicated
+    writer task so a slow client only ever delays itself. Queued events are
+    sent in batches, as a JSON array text frame or a msgpack binary frame.
+    """
+
+    def __init__(self, user_id: str, websocket: WebSocket, queue_size: int,
+                 batcher: EventBatcher, subprotocol: Optional[str] = None):
+        self.user_id = user_id
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.batcher = batcher
+        self.subprotocol = subprotocol
+        self.writer: Optional[asyncio.Task] = None
+
+    def start(self, on_error):
+        self.writer = asyncio.create_task(self._write(on_error))
+
+    async def _write(self, on_error):
+        try:
+            while True:
+                batch = await self.batcher.next_batch(self.queue)
+                if self.subprotocol == MSGPACK_SUBPROTOCOL:
+                    await self.websocket.send_bytes(encode_msgpack(batch))
+                else:
+                    await self.websocket.send_text(encode_json(batch))
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logging.error(f"error sending websocket message to {self.user_id}: {exc}")
+            on_error(self)
+
+    def stop(self):
+        if self.writer is not None and self.writer is not asyncio.current_task():
+            self.writer.cancel()
+
 
 class ConnectionManager:
-    def __init__(self):
-        # user_id -> WebSocket
-        self.active_connections: Dict[str, WebSocket] = {}
+    def __init__(self, backend: Optional[BroadcastBackend] = None, queue_size: Optional[int] = None,
+                 batcher: Optional[EventBatcher] = None):
+        # user_id -> {WebSocket: Connection}, one entry per open tab/device
+        self.active_connections: Dict[str, Dict[WebSocket, Connection]] = {}
+        self.backend = backend or create_broadcast_backend()
+        self.queue_size = queue_size or Config.WEBSOCKET_SEND_QUEUE_SIZE
+        self.batcher = batcher or EventBatcher(
+            window=Config.WEBSOCKET_BATCH_WINDOW_MS / 1000,
+            max_events=Config.WEBSOCKET_BATCH_MAX_EVENTS,
+        )
+        self.evicted = 0
+        self._closing = set()
+
+    async def start(self):
+        """Subscribe this process to the broadcast backend (web processes only)."""
+        await self.backend.subscribe(self.deliver_local)
+
+    async def stop(self):
+        await self.backend.close()
+        for connections in list(self.active_connections.values()):
+            for connection in list(connections.values()):
+                connection.stop()
+        self.active_connections.clear()
 
     async def connect(self, user_id: str, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections[user_id] = websocket
+        subprotocol = negotiate_subprotocol(websocket.scope.get("subprotocols", []))
+        await websocket.accept(subprotocol=subprotocol)
+        connection = Connection(user_id, websocket, self.queue_size, self.batcher, subprotocol)
+        self.active_connections.setdefault(user_id, {})[websocket] = connection
+        connection.start(on_error=self._remove)
+
+    def disconnect(self, user_id: str, websocket: WebSocket):
+        connection = self.active_connections.get(user_id, {}).get(websocket)
+        if connection is not None:
+            self._remove(connection)
+
+    def _remove(self, connection: Connection):
+        connections = self.active_connections.get(connection.user_id)
+        if connections is not None and connections.get(connection.websocket) is connection:
+            del connections[connection.websocket]
+            if not connections:
+                del self.active_connections[connection.user_id]
+        connection.stop()
+
+    def _evict(self, connection: Connection):
+        self.evicted += 1
+        logging.warning(f"evicting slow websocket consumer for {connection.user_id}")
+        self._remove(connection)
+        close = asyncio.create_task(self._close(connection.websocket))
+        # keep a reference until done, the loop only holds weak ones
+        self._closing.add(close)
+        close.add_done_callback(self._closing.discard)
+
+    @staticmethod
+    async def _close(websocket: WebSocket):
+        try:
+            await asyncio.wait_for(
+                websocket.close(code=SLOW_CONSUMER_CLOSE_CODE, reason="Too slow"),
+                timeout=1,
+            )
+        except Exception:
+            pass
+
+    async def send_to_user(self, user_id: str, event: dict):
+        """Publish an event for the user; it reaches whichever process holds the socket."""
+        await self.backend.publish([user_id], event)
 
-    def disconnect(self, user_id: str):
-        self.active_connections.pop(user_id, None)
+    async def broadcast(self, user_ids: Iterable[str], event: dict):
+        """Publish one event for many users in a single backend round trip."""
+        await self.backend.publish(list(user_ids), event)
 
-    async def send_to_user(self, user_id: str, message: str):
-        websocket = self.active_connections.get(user_id)
-        if websocket:
-            await websocket.send_text(message)
+    async def deliver_local(self, user_ids: Iterable[str], event: dict):
+        """
+        Queue the event on every local connection of the given users without
+        waiting on any socket. Connections whose queue is full are evicted.
+        """
+        for user_id in user_ids:
+            for connection in list(self.active_connections.get(user_id, {}).values()):
+                try:
+                    connection.queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    self._evict(connection)
 
-manager = ConnectionManager()
\ No newline at end of file
+manager = ConnectionManager()
@@ -1,6 +1,5 @@
 from fastapi import APIRouter, Depends, WebSocket, WebSocketDisconnect
 from app.core.dependencies import get_manager
-from app.websockets import manager
 from app.websockets.manager import manager
 
 router = APIRouter()
@@ -13,4 +12,7 @@ async def websocket_endpoint(websocket: WebSocket, user_id: str):
             # Keeps the connection alive
             await websocket.receive_text()
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(user_id, websocket)
+
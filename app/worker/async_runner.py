@@ -0,0 +1,73 @@
+import asyncio
+import threading
+from typing import Awaitable, Callable, Optional
+
+from app.core.config import Config
+from app.database.asyncdb import core as mongo
+
+
+class AsyncRunner:
+    """
+    One long-lived event loop per worker process, running in a background
+    thread. Celery tasks hand their coroutine to it and block on the result,
+    so with a thread pool (`-P threads`) many task coroutines wait on I/O
+    concurrently on a single loop, sharing one Motor client and Redis
+    connection, instead of each message building and tearing down a loop.
+
+    Each Celery thread still blocks until its coroutine finishes, so the
+    number of coroutines in flight is bounded by the thread count (`-c`).
+    What the shared loop saves is the per-message setup of a loop and a
+    Motor client. `max_concurrency` is only an extra cap and matters only
+    when it is lower than `-c`.
+    """
+
+    def __init__(self, max_concurrency: int, connect_db: bool = True):
+        self.max_concurrency = max_concurrency
+        self.connect_db = connect_db
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._loop is not None:
+                return
+            loop = asyncio.new_event_loop()
+            self._thread = threading.Thread(target=loop.run_forever, name="celery-async-loop", daemon=True)
+            self._thread.start()
+            asyncio.run_coroutine_threadsafe(self._setup(), loop).result()
+            self._loop = loop
+
+    async def _setup(self):
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        if self.connect_db:
+            mongo.connect()
+
+    async def _bounded(self, coro_fn: Callable[..., Awaitable], args: tuple):
+        async with self._semaphore:
+            return await coro_fn(*args)
+
+    def run(self, coro_fn: Callable[..., Awaitable], *args, timeout: Optional[float] = None):
+        """Runs `coro_fn(*args)` on the shared loop and returns its result (thread-safe)."""
+        if self._loop is None:
+            self.start()
+        future = asyncio.run_coroutine_threadsafe(self._bounded(coro_fn, args), self._loop)
+        return future.result(timeout)
+
+    def stop(self):
+        with self._lock:
+            if self._loop is None:
+                return
+            loop, self._loop = self._loop, None
+            asyncio.run_coroutine_threadsafe(self._teardown(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            self._thread.join()
+            loop.close()
+
+    async def _teardown(self):
+        if self.connect_db:
+            mongo.close()
+
+
+runner = AsyncRunner(max_concurrency=Config.CELERY_ASYNC_CONCURRENCY)
@@ -10,6 +10,7 @@ celery_app = Celery(
 celery_app.conf.update(
     task_routes={
         "app.celery_task.task.task_update": {"queue": "default_queue"},
+        "app.celery_task.task.reconcile_task_stats": {"queue": "default_queue"},
     }
 )
 
@@ -0,0 +1,92 @@
+"""
+Celery task throughput for an I/O-bound coroutine: `asyncio.run` per message
+versus the shared AsyncRunner loop, both fed by the same number of worker
+threads (`-P threads -c N`).
+
+Each Celery thread blocks until its coroutine finishes in both modes, so
+concurrency is set by the thread count, not by the loop. What the shared
+loop saves is the per-message setup: a new event loop, and a new Motor
+client and connection, because clients are bound to the loop that made
+them. `--setup-wait` simulates that connection setup; the shared loop pays
+it once.
+
+The task body is simulated by a coroutine that waits `--io-wait` seconds, so
+no broker or database is needed.
+
+    python -m benchmarks.celery_async --messages 400 --io-wait 0.05 --threads 8 100
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017/benchmark")
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark")
+os.environ.setdefault("BROKER_URL", "redis://localhost:6379/0")
+os.environ.setdefault("CELERY_RESULT_BACKEND", "redis://localhost:6379/0")
+
+from app.worker.async_runner import AsyncRunner  # noqa: E402
+
+
+def make_task(io_wait: float):
+    async def task_body():
+        await asyncio.sleep(io_wait)
+    return task_body
+
+
+def run_per_message_loop(messages: int, threads: int, setup_wait: float, task_body) -> float:
+    async def with_setup():
+        # a fresh loop needs its own client and connection
+        await asyncio.sleep(setup_wait)
+        await task_body()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda _: asyncio.run(with_setup()), range(messages)))
+    return time.perf_counter() - started
+
+
+def run_shared_loop(messages: int, threads: int, setup_wait: float, task_body) -> float:
+    # no database is needed for the simulated task; the cap is set to the
+    # thread count, which bounds concurrency anyway
+    runner = AsyncRunner(max_concurrency=threads, connect_db=False)
+    started = time.perf_counter()
+    runner.start()
+    runner.run(asyncio.sleep, setup_wait)
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(lambda _: runner.run(task_body), range(messages)))
+    elapsed = time.perf_counter() - started
+    runner.stop()
+    return elapsed
+
+
+def main(messages: int, io_wait: float, setup_wait: float, thread_counts: list):
+    task_body = make_task(io_wait)
+    results = []
+    for threads in thread_counts:
+        for mode, run in (("asyncio_run_per_message", run_per_message_loop), ("shared_loop", run_shared_loop)):
+            elapsed = run(messages, threads, setup_wait, task_body)
+            results.append({
+                "mode": mode,
+                "threads": threads,
+                "messages": messages,
+                "io_wait_s": io_wait,
+                "setup_wait_s": setup_wait,
+                "elapsed_s": round(elapsed, 3),
+                "tasks_per_s": round(messages / elapsed, 1),
+            })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=400)
+    parser.add_argument("--io-wait", type=float, default=0.05, help="simulated I/O per task, in seconds")
+    parser.add_argument("--setup-wait", type=float, default=0.005,
+                        help="simulated client/connection setup per event loop, in seconds")
+    parser.add_argument("--threads", type=int, nargs="+", default=[8, 100],
+                        help="worker thread counts (celery -c), each run in both modes")
+    args = parser.parse_args()
+    main(args.messages, args.io_wait, args.setup_wait, args.threads)
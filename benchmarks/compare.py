@@ -0,0 +1,40 @@
+"""
+Diff two benchmarks.suite reports.
+
+    python -m benchmarks.compare before.json after.json
+"""
+import argparse
+import json
+
+METRICS = ("throughput_per_s", "p50_ms", "p95_ms", "p99_ms")
+
+
+def scenario_key(result: dict) -> tuple:
+    return tuple(sorted((k, v) for k, v in result.items() if k == "name" or k in ("collection_size", "connected_users")))
+
+
+def main(before_path: str, after_path: str):
+    with open(before_path) as fh:
+        before = {scenario_key(r): r for r in json.load(fh)["results"]}
+    with open(after_path) as fh:
+        after = json.load(fh)["results"]
+
+    diff = []
+    for result in after:
+        baseline = before.get(scenario_key(result))
+        if baseline is None:
+            continue
+        row = {key: value for key, value in scenario_key(result)}
+        for metric in METRICS:
+            old, new = baseline[metric], result[metric]
+            row[metric] = {"before": old, "after": new, "change_pct": round((new - old) / old * 100, 1) if old else None}
+        diff.append(row)
+    print(json.dumps(diff, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("before")
+    parser.add_argument("after")
+    args = parser.parse_args()
+    main(args.before, args.after)
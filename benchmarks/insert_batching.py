@@ -0,0 +1,87 @@
+"""
+Throughput and per-insert latency of concurrent task inserts, one
+insert_one round trip each versus group-committed by InsertBatcher.
+Needs a local mongod (`--mongo-uri`) to show the saved round trips;
+mongomock-motor (the default) only shows the batching overhead.
+
+    python -m benchmarks.insert_batching --mongo-uri mongodb://localhost:27017/bench --windows 0.5 2 5
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017/benchmark")
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark")
+os.environ.setdefault("BROKER_URL", "redis://localhost:6379/0")
+os.environ.setdefault("CELERY_RESULT_BACKEND", "redis://localhost:6379/0")
+
+from app.core.metrics import INSERT_BATCH_SIZE  # noqa: E402
+from app.database.asyncdb import core as mongo  # noqa: E402
+from app.database.asyncdb.mongo_handler import MongoDbHandler  # noqa: E402
+from benchmarks.suite import connect_database, summarize  # noqa: E402
+
+COLLECTION = "InsertBatchingBenchmark"
+
+
+def batch_stats(collection: str):
+    total = count = 0.0
+    for metric in INSERT_BATCH_SIZE.collect():
+        for sample in metric.samples:
+            if sample.labels.get("collection") != collection:
+                continue
+            if sample.name.endswith("_sum"):
+                total = sample.value
+            elif sample.name.endswith("_count"):
+                count = sample.value
+    return total, count
+
+
+async def run(handler: MongoDbHandler, name: str, inserts: int, concurrency: int, **extra) -> dict:
+    await handler.collection.delete_many({})
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+    sum_before, count_before = batch_stats(COLLECTION)
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                await handler.insert_one({"title": f"task {i}", "description": "benchmark task", "status": "pending",
+                                          "user_id": f"user-{i % 100}", "version": 1})
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(inserts)))
+    result = summarize(name, latencies, time.perf_counter() - started, errors, concurrency=concurrency, **extra)
+    documents, batches = (after - before for after, before in zip(batch_stats(COLLECTION), (sum_before, count_before)))
+    if batches:
+        result["mean_batch_size"] = round(documents / batches, 1)
+    return result
+
+
+async def main(args):
+    connect_database(args.mongo_uri)
+    results = [await run(MongoDbHandler(COLLECTION), "insert_one", args.inserts, args.concurrency)]
+    for window_ms in args.windows:
+        handler = MongoDbHandler(COLLECTION)
+        handler.enable_insert_batching(window=window_ms / 1000, max_batch=args.max_batch)
+        results.append(await run(handler, "batched", args.inserts, args.concurrency,
+                                 window_ms=window_ms, max_batch=args.max_batch))
+    await MongoDbHandler(COLLECTION).collection.drop()
+    print(json.dumps({"database": "mongod" if args.mongo_uri else "mongomock", "results": results}, indent=2))
+    mongo.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mongo-uri", help="local mongod to use instead of mongomock-motor (the database is written to)")
+    parser.add_argument("--inserts", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=256)
+    parser.add_argument("--windows", type=float, nargs="+", default=[0.5, 2, 5], help="batch windows in ms")
+    parser.add_argument("--max-batch", type=int, default=100)
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,77 @@
+"""
+Event-loop lag under concurrent logins: argon2 verification inline on the
+loop versus offloaded to the PasswordHasher process pool.
+
+    python -m benchmarks.password_hashing --logins 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017/benchmark")
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark")
+os.environ.setdefault("BROKER_URL", "redis://localhost:6379/0")
+os.environ.setdefault("CELERY_RESULT_BACKEND", "redis://localhost:6379/0")
+
+from app.auth.hashing import PasswordHasher, _hash, _verify  # noqa: E402
+
+PROBE_INTERVAL = 0.005
+
+
+async def probe_lag(samples: list, stop: asyncio.Event):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        samples.append(time.perf_counter() - started - PROBE_INTERVAL)
+
+
+async def inline_login(hashed: str):
+    # what the handler did before: verify synchronously on the loop
+    _verify("Password@123", hashed)
+
+
+async def run(mode: str, logins: int, hasher: PasswordHasher, hashed: str) -> dict:
+    samples, stop = [], asyncio.Event()
+    probe = asyncio.create_task(probe_lag(samples, stop))
+    await asyncio.sleep(PROBE_INTERVAL * 2)
+    started = time.perf_counter()
+    if mode == "inline":
+        await asyncio.gather(*(inline_login(hashed) for _ in range(logins)))
+    else:
+        await asyncio.gather(*(hasher.verify("Password@123", hashed) for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe
+    samples.sort()
+    return {
+        "mode": mode,
+        "logins": logins,
+        "elapsed_s": round(elapsed, 4),
+        "logins_per_s": round(logins / elapsed, 1),
+        "lag_max_ms": round(samples[-1] * 1000, 2),
+        "lag_p50_ms": round(statistics.median(samples) * 1000, 2),
+        "lag_p99_ms": round(samples[int(len(samples) * 0.99) - 1] * 1000, 2),
+    }
+
+
+async def main(logins: int, workers: int):
+    hasher = PasswordHasher(max_workers=workers, queue_size=logins)
+    hashed = _hash("Password@123")
+    # start the worker processes before measuring
+    await asyncio.gather(*(hasher.verify("Password@123", hashed) for _ in range(workers)))
+    try:
+        results = [await run(mode, logins, hasher, hashed) for mode in ("inline", "pool")]
+    finally:
+        hasher.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args()
+    asyncio.run(main(args.logins, args.workers))
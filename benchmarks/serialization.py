@@ -0,0 +1,80 @@
+"""
+CPU cost of serializing a page of tasks: the old path (rename _id in a
+Python loop, then FastAPI's jsonable_encoder and stdlib json) versus
+documents shaped by the $project stage and rendered by ORJSONResponse.
+
+    python -m benchmarks.serialization --sizes 10000 100000
+"""
+import argparse
+import json
+import os
+import statistics
+import time
+from datetime import datetime, timezone
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017/benchmark")
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark")
+os.environ.setdefault("BROKER_URL", "redis://localhost:6379/0")
+os.environ.setdefault("CELERY_RESULT_BACKEND", "redis://localhost:6379/0")
+
+from bson import ObjectId  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from app.core.responses import ORJSONResponse  # noqa: E402
+
+
+def raw_tasks(size: int) -> list:
+    """Documents as find() returned them."""
+    created_at = str(datetime.now(timezone.utc))
+    return [
+        {"_id": ObjectId(), "title": f"task {n}", "description": "benchmark task", "status": "pending", "created_at": created_at}
+        for n in range(size)
+    ]
+
+
+def projected_tasks(raw: list) -> list:
+    """Documents as the $project/$toString pipeline returns them."""
+    return [{"title": t["title"], "description": t["description"], "status": t["status"],
+             "created_at": t["created_at"], "id": str(t["_id"])} for t in raw]
+
+
+def before(raw: list) -> bytes:
+    tasks = [dict(task) for task in raw]  # the handler mutated driver documents in place
+    for task in tasks:
+        task["id"] = str(task["_id"])
+        del task["_id"]
+    return JSONResponse(jsonable_encoder({"tasks": tasks, "next_cursor": None})).body
+
+
+def after(projected: list) -> bytes:
+    return ORJSONResponse({"tasks": projected, "next_cursor": None}).body
+
+
+def timed(fn, data, repeat: int) -> dict:
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        body = fn(data)
+        durations.append(time.perf_counter() - started)
+    return {"median_ms": round(statistics.median(durations) * 1000, 2), "bytes": len(body)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    results = []
+    for size in args.sizes:
+        raw = raw_tasks(size)
+        projected = projected_tasks(raw)
+        old, new = timed(before, raw, args.repeat), timed(after, projected, args.repeat)
+        results.append({
+            "tasks": size,
+            "before": old,
+            "after": new,
+            "speedup": round(old["median_ms"] / new["median_ms"], 1) if new["median_ms"] else None,
+        })
+    print(json.dumps(results, indent=2))
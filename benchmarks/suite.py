@@ -0,0 +1,258 @@
+"""
+Offline load and latency suite for the HTTP and WebSocket paths
+(needs `pip install httpx mongomock-motor`).
+
+Drives the ASGI app in-process through httpx, against a local mongod
+(`--mongo-uri`) or, by default, an in-memory mongomock-motor database.
+Reports throughput and p50/p95/p99 latency per scenario as JSON, which
+`benchmarks/compare.py` can diff between commits.
+
+    python -m benchmarks.suite --output before.json
+    python -m benchmarks.suite --mongo-uri mongodb://localhost:27017/bench --sizes 1000 100000
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from typing import Awaitable, Callable, List
+
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017/benchmark")
+os.environ.setdefault("JWT_SECRET_KEY", "benchmark")
+os.environ.setdefault("BROKER_URL", "redis://localhost:6379/0")
+os.environ.setdefault("CELERY_RESULT_BACKEND", "redis://localhost:6379/0")
+os.environ.setdefault("WEBSOCKET_BROADCAST_BACKEND", "memory")
+# completions must not fire while we measure
+os.environ.setdefault("TASK_COMPLETION_DELAY_SECONDS", "3600")
+# one client drives every request, per-client limits would only measure 429s
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import httpx  # noqa: E402
+
+from app.database.asyncdb import core as mongo  # noqa: E402
+from app.database.asyncdb.indexes import ensure_indexes  # noqa: E402
+from app.websockets.batcher import EventBatcher  # noqa: E402
+from app.websockets.broadcast import InMemoryBroadcast  # noqa: E402
+from app.websockets.manager import ConnectionManager  # noqa: E402
+
+PASSWORD = "Benchmark@123"
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(name: str, latencies: List[float], elapsed: float, errors: int, **extra) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "name": name,
+        **extra,
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_per_s": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+async def measure(name: str, count: int, concurrency: int,
+                  request: Callable[[int], Awaitable[httpx.Response]], **extra) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            response = await request(i)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(count)))
+    return summarize(name, latencies, time.perf_counter() - started, errors, concurrency=concurrency, **extra)
+
+
+def connect_database(mongo_uri: str | None):
+    if mongo_uri:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(mongo_uri)
+        mongo.connect(client, client.get_default_database().name)
+    else:
+        try:
+            from mongomock_motor import AsyncMongoMockClient
+        except ImportError:
+            sys.exit("install mongomock-motor or pass --mongo-uri")
+        mongo.connect(AsyncMongoMockClient(), "benchmark")
+
+
+async def http_scenarios(client: httpx.AsyncClient, args) -> List[dict]:
+    results = []
+    run_id = int(time.time())
+    emails = [f"bench-{run_id}-{i}@example.com" for i in range(args.users)]
+
+    results.append(await measure(
+        "register", args.users, args.concurrency,
+        lambda i: client.post("/auth/register", json={
+            "email": emails[i], "password": PASSWORD, "name": "Bench", "role": "user",
+        }),
+    ))
+    tokens = {}
+
+    async def login(i: int) -> httpx.Response:
+        response = await client.post("/auth/login", data={"username": emails[i], "password": PASSWORD})
+        if response.status_code == 200:
+            tokens[i] = response.json()["access_token"]
+        return response
+
+    results.append(await measure("login", args.users, args.concurrency, login))
+    headers = {"Authorization": f"Bearer {tokens[0]}"}
+
+    task_ids = []
+
+    async def create(i: int) -> httpx.Response:
+        response = await client.post("/tasks/create", headers=headers, json={
+            "title": f"bench-{run_id}-{i}", "description": "benchmark task",
+        })
+        if response.status_code == 201:
+            task_ids.append(response.json()["task_id"])
+        return response
+
+    results.append(await measure("create", args.requests, args.concurrency, create))
+    results.append(await measure(
+        "update", len(task_ids), args.concurrency,
+        lambda i: client.put(f"/tasks/update/{task_ids[i]}", headers=headers, json={"status": "in_progress"}),
+    ))
+    results.append(await measure(
+        "delete", len(task_ids), args.concurrency,
+        lambda i: client.delete(f"/tasks/delete/{task_ids[i]}", headers=headers),
+    ))
+
+    tasks = mongo.get_database()["Tasks"]
+    for size in args.sizes:
+        list_user = tokens[1 % len(tokens)]
+        me = (await client.get("/auth/me", headers={"Authorization": f"Bearer {list_user}"})).json()["id"]
+        await tasks.delete_many({"user_id": me})
+        for offset in range(0, size, 10000):
+            await tasks.insert_many([
+                {"title": f"seed-{n}", "description": "seeded", "status": "pending", "user_id": me, "created_at": "seed"}
+                for n in range(offset, min(size, offset + 10000))
+            ])
+        list_headers = {"Authorization": f"Bearer {list_user}"}
+        results.append(await measure(
+            "list", args.requests, args.concurrency,
+            lambda i: client.get("/tasks/user/tasks", headers=list_headers, params={"limit": 100}),
+            collection_size=size,
+        ))
+        started = time.perf_counter()
+        response = await client.get("/tasks/user/tasks", headers=list_headers, params={"stream": "true"})
+        results.append(summarize(
+            "list_stream", [time.perf_counter() - started], time.perf_counter() - started,
+            int(response.status_code >= 400), collection_size=size,
+        ))
+    return results
+
+
+class BenchWebSocket:
+    """Just enough of a WebSocket for ConnectionManager, recording delivery times."""
+
+    def __init__(self):
+        self.scope = {"subprotocols": []}
+        self.delivered = asyncio.Event()
+        self.delivered_at = 0.0
+
+    async def accept(self, subprotocol=None):
+        pass
+
+    async def send_text(self, data: str):
+        self.delivered_at = time.perf_counter()
+        self.delivered.set()
+
+    async def send_bytes(self, data: bytes):
+        await self.send_text("")
+
+    async def close(self, code: int = 1000, reason: str = ""):
+        pass
+
+
+async def websocket_fanout(users: int, rounds: int) -> dict:
+    manager = ConnectionManager(InMemoryBroadcast(), batcher=EventBatcher(window=0, max_events=100))
+    await manager.start()
+    sockets = []
+    for i in range(users):
+        websocket = BenchWebSocket()
+        await manager.connect(f"user-{i}", websocket)
+        sockets.append(websocket)
+    user_ids = [f"user-{i}" for i in range(users)]
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for websocket in sockets:
+            websocket.delivered.clear()
+        sent_at = time.perf_counter()
+        await manager.broadcast(user_ids, {"type": "benchmark"})
+        await asyncio.gather(*(websocket.delivered.wait() for websocket in sockets))
+        latencies.extend(websocket.delivered_at - sent_at for websocket in sockets)
+    elapsed = time.perf_counter() - started
+    await manager.stop()
+    return summarize("websocket_fanout", latencies, elapsed, 0, connected_users=users, rounds=rounds)
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+async def main(args):
+    connect_database(args.mongo_uri)
+    await ensure_indexes(mongo.get_database())
+    from app.main import app  # imported after settings defaults are in place
+
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        results.extend(await http_scenarios(client, args))
+    for users in args.ws_users:
+        results.append(await websocket_fanout(users, args.ws_rounds))
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "database": "mongod" if args.mongo_uri else "mongomock",
+            "python": platform.python_version(),
+            "concurrency": args.concurrency,
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(output + "\n")
+    print(output)
+    from app.auth.hashing import password_hasher
+    password_hasher.shutdown()
+    mongo.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--mongo-uri", help="local mongod to use instead of mongomock-motor (the database is written to)")
+    parser.add_argument("--users", type=int, default=8, help="users to register and log in (argon2-bound)")
+    parser.add_argument("--requests", type=int, default=200, help="requests per task scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 10000], help="collection sizes for listing")
+    parser.add_argument("--ws-users", type=int, nargs="+", default=[10, 1000], help="connected users for fan-out")
+    parser.add_argument("--ws-rounds", type=int, default=20)
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,20 @@
+import os
+
+import pytest
+from mongomock_motor import AsyncMongoMockClient
+
+# app.core.config reads these at import time; the tests never connect to them
+os.environ.setdefault("MONGO_URI", "mongodb://localhost:27017/test")
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret")
+os.environ.setdefault("BROKER_URL", "redis://localhost:6379/0")
+os.environ.setdefault("CELERY_RESULT_BACKEND", "redis://localhost:6379/0")
+
+
+@pytest.fixture
+def mongo():
+    """An in-process mongomock database installed as the app's database."""
+    from app.database.asyncdb import core
+
+    core.connect(AsyncMongoMockClient(), "test")
+    yield core.get_database()
+    core.close()
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from app.database.asyncdb.batcher import DUPLICATE_KEY_ERROR, InsertBatcher
+
+
+class RecordingInsert:
+    def __init__(self, fail_with=None):
+        self.batches = []
+        self.fail_with = fail_with
+
+    async def __call__(self, documents):
+        self.batches.append([document["title"] for document in documents])
+        if self.fail_with is not None:
+            raise self.fail_with(documents)
+
+
+def test_concurrent_inserts_share_one_insert_many():
+    async def scenario():
+        insert = RecordingInsert()
+        batcher = InsertBatcher(insert, "Tasks", window=0.01, max_batch=100)
+        documents = [{"title": f"t{number}"} for number in range(5)]
+        results = await asyncio.gather(*(batcher.insert_one(document) for document in documents))
+        return insert, documents, results
+
+    insert, documents, results = asyncio.run(scenario())
+    assert insert.batches == [["t0", "t1", "t2", "t3", "t4"]]
+    assert [result.inserted_id for result in results] == [document["_id"] for document in documents]
+
+
+def test_a_full_batch_is_sent_without_waiting_for_the_window():
+    async def scenario():
+        insert = RecordingInsert()
+        batcher = InsertBatcher(insert, "Tasks", window=60, max_batch=2)
+        await asyncio.wait_for(
+            asyncio.gather(*(batcher.insert_one({"title": f"t{number}"}) for number in range(4))), timeout=1
+        )
+        return insert
+
+    assert asyncio.run(scenario()).batches == [["t0", "t1"], ["t2", "t3"]]
+
+
+def test_each_caller_gets_the_error_of_its_own_document():
+    def duplicate_second(documents):
+        return BulkWriteError({"writeErrors": [{"index": 1, "code": DUPLICATE_KEY_ERROR, "errmsg": "dup"}]})
+
+    async def scenario():
+        batcher = InsertBatcher(RecordingInsert(duplicate_second), "Tasks", window=0.01, max_batch=100)
+        return await asyncio.gather(
+            *(batcher.insert_one({"title": f"t{number}"}) for number in range(3)), return_exceptions=True
+        )
+
+    first, second, third = asyncio.run(scenario())
+    assert isinstance(second, DuplicateKeyError)
+    assert not isinstance(first, Exception) and not isinstance(third, Exception)
+
+
+def test_a_failed_batch_fails_every_caller():
+    async def scenario():
+        batcher = InsertBatcher(RecordingInsert(lambda documents: ConnectionError("down")), "Tasks",
+                                window=0.01, max_batch=100)
+        return await asyncio.gather(*(batcher.insert_one({"title": "t"}) for _ in range(2)), return_exceptions=True)
+
+    assert all(isinstance(result, ConnectionError) for result in asyncio.run(scenario()))
+
+
+def test_a_cancelled_caller_does_not_cancel_the_batch():
+    async def scenario():
+        insert = RecordingInsert()
+        batcher = InsertBatcher(insert, "Tasks", window=0.02, max_batch=100)
+        cancelled = asyncio.create_task(batcher.insert_one({"title": "cancelled"}))
+        kept = asyncio.create_task(batcher.insert_one({"title": "kept"}))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await kept
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+        return insert
+
+    assert asyncio.run(scenario()).batches == [["cancelled", "kept"]]
@@ -0,0 +1,23 @@
+from app.core.bloom import BloomFilter
+
+
+def test_added_items_are_always_found():
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    items = [f"jti-{number}" for number in range(1000)]
+    for item in items:
+        bloom.add(item)
+    assert all(item in bloom for item in items)
+    assert bloom.count == 1000
+
+
+def test_false_positive_rate_stays_near_the_target_at_capacity():
+    bloom = BloomFilter(capacity=2000, error_rate=0.01)
+    for number in range(2000):
+        bloom.add(f"revoked-{number}")
+    false_positives = sum(f"never-revoked-{number}" in bloom for number in range(20000))
+    assert false_positives / 20000 < 0.02
+
+
+def test_empty_filter_contains_nothing():
+    bloom = BloomFilter(capacity=0, error_rate=0.001)
+    assert "anything" not in bloom
@@ -0,0 +1,93 @@
+import asyncio
+
+import fakeredis
+import pytest
+
+from app.websockets.broadcast import BroadcastBackend, InMemoryBroadcast, RedisBroadcast
+
+
+def redis_backends(count: int):
+    server = fakeredis.FakeServer()
+    factory = lambda url: fakeredis.FakeAsyncRedis(server=server)  # noqa: E731
+    return [RedisBroadcast(url="redis://fake", channel="events", client_factory=factory) for _ in range(count)]
+
+
+async def wait_for(predicate, timeout: float = 2.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.01)
+
+
+def test_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        BroadcastBackend()
+
+
+def test_in_memory_delivers_to_the_local_handler():
+    async def scenario():
+        received = []
+
+        async def handler(user_ids, event):
+            received.append((user_ids, event))
+
+        backend = InMemoryBroadcast()
+        await backend.publish(["u1"], {"type": "lost"})
+        await backend.subscribe(handler)
+        await backend.publish(["u1"], {"type": "task.created"})
+        await backend.close()
+        await backend.publish(["u1"], {"type": "after-close"})
+        return received
+
+    assert asyncio.run(scenario()) == [(["u1"], {"type": "task.created"})]
+
+
+def test_redis_fans_out_to_every_subscribed_process():
+    async def scenario():
+        first, second, publisher = redis_backends(3)
+        received = {"first": [], "second": []}
+
+        def collect(name):
+            async def handler(user_ids, event):
+                received[name].append((user_ids, event))
+            return handler
+
+        await first.subscribe(collect("first"))
+        await second.subscribe(collect("second"))
+        # the listeners subscribe in the background
+        await wait_for(lambda: all(b._client is not None for b in (first, second)))
+        await asyncio.sleep(0.05)
+        await publisher.publish(["u1", "u2"], {"type": "task.updated", "task_id": "t1"})
+        await wait_for(lambda: received["first"] and received["second"])
+        for backend in (first, second, publisher):
+            await backend.close()
+        return received
+
+    received = asyncio.run(scenario())
+    expected = [(["u1", "u2"], {"type": "task.updated", "task_id": "t1"})]
+    assert received == {"first": expected, "second": expected}
+
+
+def test_redis_listener_survives_a_bad_message():
+    async def scenario():
+        subscriber, publisher = redis_backends(2)
+        received = []
+
+        async def handler(user_ids, event):
+            received.append(event)
+
+        await subscriber.subscribe(handler)
+        await wait_for(lambda: subscriber._client is not None)
+        await asyncio.sleep(0.05)
+        await publisher._get_client().publish("events", "not json")
+        await publisher.publish(["u1"], {"type": "task.deleted"})
+        await wait_for(lambda: received)
+        listener_alive = not subscriber._listener.done()
+        await subscriber.close()
+        await publisher.close()
+        return received, listener_alive
+
+    received, listener_alive = asyncio.run(scenario())
+    assert received == [{"type": "task.deleted"}]
+    assert listener_alive
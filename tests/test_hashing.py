@@ -0,0 +1,39 @@
+import asyncio
+import os
+import signal
+
+import pytest
+from fastapi import HTTPException
+
+from app.auth.hashing import PasswordHasher
+from app.auth.service import AuthService
+
+
+def test_a_killed_worker_is_replaced_and_the_call_retried():
+    async def scenario():
+        hasher = PasswordHasher(max_workers=1, queue_size=4)
+        try:
+            hashed = await hasher.hash("secret")
+            broken = hasher._executor
+            for process in broken._processes.values():
+                os.kill(process.pid, signal.SIGKILL)
+            verified = await hasher.verify("secret", hashed)
+            return verified, hasher._executor is not broken
+        finally:
+            hasher.shutdown()
+
+    assert asyncio.run(scenario()) == (True, True)
+
+
+def test_a_malformed_stored_hash_is_a_failed_login(monkeypatch):
+    async def scenario():
+        hasher = PasswordHasher(max_workers=1, queue_size=4)
+        monkeypatch.setattr("app.auth.service.password_hasher", hasher)
+        try:
+            with pytest.raises(HTTPException) as rejected:
+                await AuthService.verify_password_async("secret", "not a hash")
+            return rejected.value.status_code
+        finally:
+            hasher.shutdown()
+
+    assert asyncio.run(scenario()) == 401
@@ -0,0 +1,106 @@
+import asyncio
+
+import fakeredis
+import pytest
+
+from app.database.asyncdb.cache import QueryCache
+from app.database.asyncdb.mongo_handler import MongoDbHandler
+
+
+def cached_handlers(count: int = 1, redis: bool = False):
+    """Handlers of one collection, each with its own cache as if in separate processes."""
+    server = fakeredis.FakeServer()
+    factory = lambda url: fakeredis.FakeAsyncRedis(server=server)  # noqa: E731
+    handlers = []
+    for _ in range(count):
+        handler = MongoDbHandler("Users")
+        handler.single_flight = None
+        handler.cache = QueryCache(maxsize=100, ttl=30, redis_url="redis://fake" if redis else None,
+                                   client_factory=factory)
+        handlers.append(handler)
+    return handlers
+
+
+async def seed(mongo):
+    result = await mongo["Users"].insert_many([{"name": "ann"}, {"name": "bob"}])
+    return result.inserted_ids
+
+
+def test_a_single_document_write_keeps_other_documents_cached(mongo):
+    async def scenario():
+        (users,) = cached_handlers()
+        ann, bob = await seed(mongo)
+        await users.find_one({"_id": ann}, use_cache=True)
+        await users.find_one({"_id": bob}, use_cache=True)
+        await users.update_one({"_id": bob}, {"$set": {"name": "bobby"}})
+        cached_ann = await users.find_one({"_id": ann}, use_cache=True)
+        fresh_bob = await users.find_one({"_id": bob}, use_cache=True)
+        return users.cache.stats()["Users"], cached_ann, fresh_bob
+
+    stats, cached_ann, fresh_bob = asyncio.run(scenario())
+    assert cached_ann == {"name": "ann"}
+    assert fresh_bob == {"name": "bobby"}
+    assert (stats["hits"], stats["misses"]) == (1, 3)
+
+
+def test_unscoped_reads_see_every_single_document_write(mongo):
+    async def scenario():
+        (users,) = cached_handlers()
+        ann, _ = await seed(mongo)
+        await users.find({}, use_cache=True)
+        await users.update_one({"_id": ann}, {"$set": {"name": "anne"}})
+        after_update = await users.find({}, use_cache=True)
+        await users.insert_one({"name": "cat"})
+        after_insert = await users.find({}, use_cache=True)
+        return after_update, after_insert
+
+    after_update, after_insert = asyncio.run(scenario())
+    assert [user["name"] for user in after_update] == ["anne", "bob"]
+    assert [user["name"] for user in after_insert] == ["anne", "bob", "cat"]
+
+
+@pytest.mark.parametrize("write", [
+    lambda users, ann: users.update_many({"name": {"$ne": None}}, {"$set": {"name": "renamed"}}),
+    lambda users, ann: users.update_one({"name": "ann"}, {"$set": {"name": "renamed"}}),
+], ids=["update_many", "update_one-without-_id"])
+def test_writes_not_pinned_to_a_document_invalidate_the_collection(mongo, write):
+    async def scenario():
+        (users,) = cached_handlers()
+        ann, _ = await seed(mongo)
+        await users.find_one({"_id": ann}, use_cache=True)
+        await write(users, ann)
+        return await users.find_one({"_id": ann}, use_cache=True)
+
+    assert asyncio.run(scenario()) == {"name": "renamed"}
+
+
+def test_a_write_during_a_load_is_not_cached_over(mongo):
+    async def scenario():
+        (users,) = cached_handlers()
+        ann, _ = await seed(mongo)
+        generation = users.cache.generation("Users", QueryCache.scope({"_id": ann}, "_id"))
+        await users.update_one({"_id": ann}, {"$set": {"name": "anne"}})
+        digest = QueryCache.digest("find_one", {"_id": ann}, {"_id": 0})
+        await users.cache.set("Users", QueryCache.scope({"_id": ann}, "_id"), digest, {"name": "ann"}, generation)
+        return await users.find_one({"_id": ann}, use_cache=True)
+
+    assert asyncio.run(scenario()) == {"name": "anne"}
+
+
+def test_redis_shares_scoped_invalidations_across_processes(mongo):
+    async def scenario():
+        first, second = cached_handlers(2, redis=True)
+        ann, bob = await seed(mongo)
+        await first.find_one({"_id": ann}, use_cache=True)
+        await first.find_one({"_id": bob}, use_cache=True)
+        await second.update_one({"_id": bob}, {"$set": {"name": "bobby"}})
+        # the first process's local entries would still be fresh; use the shared tier
+        first.cache._entries.clear()
+        ann_read = await first.find_one({"_id": ann}, use_cache=True)
+        bob_read = await first.find_one({"_id": bob}, use_cache=True)
+        return first.cache.stats()["Users"], ann_read, bob_read
+
+    stats, ann_read, bob_read = asyncio.run(scenario())
+    assert ann_read == {"name": "ann"}
+    assert bob_read == {"name": "bobby"}
+    assert stats["redis_hits"] == 1
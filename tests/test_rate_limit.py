@@ -0,0 +1,107 @@
+import asyncio
+
+import fakeredis
+import pytest
+from fastapi import HTTPException
+
+from app.core.rate_limit import InMemoryTokenBucket, RateLimit, RedisTokenBucket, TokenBucketBackend
+
+
+def redis_buckets(count: int):
+    server = fakeredis.FakeServer()
+    factory = lambda url: fakeredis.FakeAsyncRedis(server=server)  # noqa: E731
+    return [RedisTokenBucket(url="redis://fake", client_factory=factory) for _ in range(count)]
+
+
+def test_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        TokenBucketBackend()
+
+
+@pytest.mark.parametrize("make_backend", [
+    lambda: InMemoryTokenBucket(max_keys=10),
+    lambda: redis_buckets(1)[0],
+], ids=["memory", "redis"])
+def test_bucket_allows_the_burst_then_asks_to_wait(make_backend):
+    async def scenario():
+        backend = make_backend()
+        # 1 token per second, 3 tokens of burst
+        allowed = [await backend.take("login:1.2.3.4", 1.0, 3) for _ in range(3)]
+        refused = await backend.take("login:1.2.3.4", 1.0, 3)
+        other_client = await backend.take("login:5.6.7.8", 1.0, 3)
+        return allowed, refused, other_client
+
+    allowed, refused, other_client = asyncio.run(scenario())
+    assert allowed == [0, 0, 0]
+    assert 0 < refused <= 1
+    assert other_client == 0
+
+
+@pytest.mark.parametrize("make_backend", [
+    lambda: InMemoryTokenBucket(max_keys=10),
+    lambda: redis_buckets(1)[0],
+], ids=["memory", "redis"])
+def test_cost_is_taken_in_one_go(make_backend):
+    async def scenario():
+        backend = make_backend()
+        first = await backend.take("bulk:u1", 1.0, 10, cost=8)
+        second = await backend.take("bulk:u1", 1.0, 10, cost=8)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first == 0
+    # 2 tokens left, 6 more needed at one per second
+    assert 5 < second <= 6
+
+
+def test_redis_buckets_are_shared_across_workers():
+    async def scenario():
+        first, second = redis_buckets(2)
+        await first.take("task_write:u1", 1.0, 2)
+        await second.take("task_write:u1", 1.0, 2)
+        return await first.take("task_write:u1", 1.0, 2)
+
+    assert asyncio.run(scenario()) > 0
+
+
+def test_redis_outage_lets_requests_through():
+    def unreachable(url):
+        raise ConnectionError("redis is down")
+
+    backend = RedisTokenBucket(url="redis://down", client_factory=unreachable)
+    assert asyncio.run(backend.take("login:1.2.3.4", 1.0, 1)) == 0
+
+
+@pytest.mark.parametrize("make_backend", [
+    lambda: InMemoryTokenBucket(max_keys=10),
+    lambda: redis_buckets(1)[0],
+], ids=["memory", "redis"])
+def test_cost_above_capacity_leaves_the_bucket_in_debt(make_backend):
+    async def scenario():
+        backend = make_backend()
+        partial = await backend.take("bulk:u2", 1.0, 10, cost=1)
+        # a bulk larger than the bucket needs it full
+        refused = await backend.take("bulk:u2", 1.0, 10, cost=40)
+        other = await backend.take("bulk:u1", 1.0, 10, cost=40)
+        following = await backend.take("bulk:u1", 1.0, 10)
+        return partial, refused, other, following
+
+    partial, refused, other, following = asyncio.run(scenario())
+    assert partial == 0 and 0 < refused <= 1
+    assert other == 0
+    # 30 tokens of debt plus the one asked for
+    assert 30 < following <= 31
+
+
+def test_check_rejects_the_writes_after_a_bulk_larger_than_the_burst():
+    async def scenario():
+        limit = RateLimit("bulk", per_minute=60, burst=5, backend=InMemoryTokenBucket(max_keys=10))
+        await limit.check("u1", cost=50)
+        with pytest.raises(HTTPException) as rejected:
+            await limit.check("u1")
+        return rejected.value
+
+    rejected = asyncio.run(scenario())
+    assert rejected.status_code == 429
+    # the 45 tokens of debt and the one asked for, at one token per second
+    assert rejected.headers["Retry-After"] == "46"
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from app.database.asyncdb.single_flight import SingleFlight
+
+
+class SlowRead:
+    def __init__(self, result=None, error=None):
+        self.calls = 0
+        self.result = result
+        self.error = error
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(0.01)
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def test_identical_concurrent_reads_run_once():
+    async def scenario():
+        flight = SingleFlight()
+        load = SlowRead(result=[{"title": "t"}])
+        results = await asyncio.gather(*(flight.do("Tasks", "key", load) for _ in range(5)))
+        return flight, load, results
+
+    flight, load, results = asyncio.run(scenario())
+    assert load.calls == 1
+    assert results == [[{"title": "t"}]] * 5
+    assert flight.stats()["Tasks"] == {"queries": 1, "deduplicated": 4, "deduplicated_ratio": 0.8}
+
+
+def test_a_caller_mutating_its_result_does_not_leak_to_the_others():
+    async def scenario():
+        flight = SingleFlight()
+        load = SlowRead(result=[{"title": "t"}])
+
+        async def mutating_caller():
+            tasks = await flight.do("Tasks", "key", load)
+            tasks[0]["title"] = "changed"
+            tasks.append({"title": "extra"})
+            return tasks
+
+        leader = asyncio.create_task(mutating_caller())
+        await asyncio.sleep(0)
+        joiners = [asyncio.create_task(flight.do("Tasks", "key", load)) for _ in range(2)]
+        await leader
+        return await asyncio.gather(*joiners)
+
+    first, second = asyncio.run(scenario())
+    assert first == second == [{"title": "t"}]
+    assert first is not second
+
+
+def test_errors_reach_every_caller_and_are_not_remembered():
+    async def scenario():
+        flight = SingleFlight()
+        failing = SlowRead(error=RuntimeError("boom"))
+        results = await asyncio.gather(*(flight.do("Tasks", "key", failing) for _ in range(2)),
+                                       return_exceptions=True)
+        retried = await flight.do("Tasks", "key", SlowRead(result="fresh"))
+        return results, retried
+
+    results, retried = asyncio.run(scenario())
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert retried == "fresh"
+
+
+def test_a_write_stops_later_readers_from_joining():
+    async def scenario():
+        flight = SingleFlight()
+        before = SlowRead(result="before write")
+        after = SlowRead(result="after write")
+        first = asyncio.create_task(flight.do("Tasks", "key", before))
+        await asyncio.sleep(0)
+        flight.forget("Tasks")
+        second = await flight.do("Tasks", "key", after)
+        return await first, second
+
+    assert asyncio.run(scenario()) == ("before write", "after write")
+
+
+def test_a_cancelled_joiner_does_not_cancel_the_read():
+    async def scenario():
+        flight = SingleFlight()
+        load = SlowRead(result="done")
+        leader = asyncio.create_task(flight.do("Tasks", "key", load))
+        await asyncio.sleep(0)
+        joiner = asyncio.create_task(flight.do("Tasks", "key", load))
+        await asyncio.sleep(0)
+        joiner.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await joiner
+        return await leader
+
+    assert asyncio.run(scenario()) == "done"
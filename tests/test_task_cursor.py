@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+from bson import ObjectId
+from fastapi import HTTPException
+
+from app.tasks.service import TaskService
+
+
+def test_creation_order_cursor_round_trips():
+    task_id = ObjectId()
+    cursor = TaskService.encode_cursor(task_id)
+    assert "=" not in cursor
+    assert TaskService.decode_cursor(cursor) == (task_id, task_id)
+
+
+@pytest.mark.parametrize("value", ["Write tests", "pending", None])
+def test_sorted_cursor_round_trips(value):
+    task_id = ObjectId()
+    cursor = TaskService.encode_cursor(task_id, "title", value)
+    assert TaskService.decode_cursor(cursor, "title") == (value, task_id)
+
+
+@pytest.mark.parametrize("cursor, sort_field", [
+    ("not a cursor", "_id"),
+    ("", "title"),
+    (TaskService.encode_cursor(ObjectId(), "title", "a"), "status"),
+    (TaskService.encode_cursor(ObjectId()), "title"),
+])
+def test_malformed_or_foreign_cursors_are_rejected(cursor, sort_field):
+    with pytest.raises(HTTPException) as rejected:
+        TaskService.decode_cursor(cursor, sort_field)
+    assert rejected.value.status_code == 400
+
+
+@pytest.mark.parametrize("sort, descending", [("created", False), ("title", False), ("title", True)])
+def test_pages_cover_every_task_once(mongo, sort, descending):
+    async def scenario():
+        # duplicate titles make _id the tie-breaker
+        await mongo["Tasks"].insert_many([
+            {"user_id": "u1", "title": f"task {number % 3}", "description": "", "status": "pending"}
+            for number in range(7)
+        ])
+        await mongo["Tasks"].insert_one({"user_id": "u2", "title": "other", "description": "", "status": "pending"})
+        pages, cursor = [], None
+        while True:
+            page, cursor = await TaskService.get_tasks("u1", limit=3, cursor=cursor, sort=sort, descending=descending)
+            pages.append(page)
+            if cursor is None:
+                return pages
+
+    pages = asyncio.run(scenario())
+    tasks = [task for page in pages for task in page]
+    assert [len(page) for page in pages] == [3, 3, 1]
+    assert len({task["id"] for task in tasks}) == 7
+    keys = [(task["title"], task["id"]) if sort == "title" else task["id"] for task in tasks]
+    assert keys == sorted(keys, reverse=descending)
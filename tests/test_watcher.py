@@ -0,0 +1,140 @@
+import asyncio
+
+from bson import ObjectId
+from pymongo.errors import OperationFailure
+
+from app.tasks.watcher import CHANGE_STREAM_HISTORY_LOST, TaskChangeWatcher, change_to_event
+
+
+class FakeManager:
+    def __init__(self):
+        self.delivered = []
+
+    async def deliver_local(self, user_ids, event):
+        self.delivered.append((list(user_ids), event))
+
+
+class FakeDatabase:
+    async def command(self, *args, **kwargs):
+        return {"ok": 1}
+
+
+class FakeStream:
+    """Yields the scripted changes, then waits like an idle change stream."""
+
+    def __init__(self, changes):
+        self.changes = changes
+        self.resume_token = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for number, change in enumerate(self.changes):
+            self.resume_token = {"_data": f"token-{number}"}
+            yield change
+        await asyncio.Event().wait()
+
+
+class FakeCollection:
+    """Stands in for the Tasks collection; each watch() plays the next script."""
+
+    name = "Tasks"
+    database = FakeDatabase()
+
+    def __init__(self, *scripts):
+        self.scripts = list(scripts)
+        self.resumed_after = []
+
+    def watch(self, resume_after=None, **kwargs):
+        self.resumed_after.append(resume_after)
+        script = self.scripts.pop(0)
+        if isinstance(script, Exception):
+            raise script
+        return FakeStream(script)
+
+
+def insert_change(user_id="u1"):
+    task_id = ObjectId()
+    return {
+        "operationType": "insert",
+        "documentKey": {"_id": task_id},
+        "fullDocument": {"_id": task_id, "user_id": user_id, "title": "t", "status": "pending", "secret": "x"},
+    }
+
+
+async def run_watcher(watcher, until, timeout=2.0):
+    await watcher.start()
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not until():
+        assert asyncio.get_running_loop().time() < deadline, "watcher did not get there in time"
+        await asyncio.sleep(0.01)
+    await watcher.stop()
+
+
+def test_change_to_event_shapes_compact_deltas():
+    change = insert_change()
+    user_id, event = change_to_event(change)
+    assert user_id == "u1"
+    assert event["type"] == "task.created"
+    assert event["task"] == {"id": str(change["documentKey"]["_id"]), "title": "t", "status": "pending"}
+
+    task_id = ObjectId()
+    user_id, event = change_to_event({
+        "operationType": "update",
+        "documentKey": {"_id": task_id},
+        "fullDocument": {"_id": task_id, "user_id": "u2"},
+        "updateDescription": {"updatedFields": {"status": "completed"}, "removedFields": ["description"]},
+    })
+    assert (user_id, event) == ("u2", {
+        "type": "task.updated", "task_id": str(task_id), "fields": {"status": "completed"}, "removed": ["description"],
+    })
+
+    user_id, event = change_to_event({
+        "operationType": "delete",
+        "documentKey": {"_id": task_id},
+        "fullDocumentBeforeChange": {"_id": task_id, "user_id": "u3"},
+    })
+    assert (user_id, event) == ("u3", {"type": "task.deleted", "task_id": str(task_id)})
+
+    assert change_to_event({"operationType": "drop"}) == (None, None)
+
+
+def test_watcher_delivers_changes_and_resumes_from_the_checkpoint(mongo):
+    async def scenario():
+        manager = FakeManager()
+        collection = FakeCollection([insert_change("u1"), insert_change("u2")], [insert_change("u3")])
+        factory = lambda: collection  # noqa: E731
+        first = TaskChangeWatcher(manager, checkpoint_interval=0, collection_factory=factory)
+        await run_watcher(first, lambda: len(manager.delivered) == 2)
+        # a restarted process resumes after the last change it delivered
+        second = TaskChangeWatcher(manager, checkpoint_interval=0, collection_factory=factory)
+        await run_watcher(second, lambda: len(manager.delivered) == 3)
+        return manager, collection
+
+    manager, collection = asyncio.run(scenario())
+    assert [user_ids for user_ids, _ in manager.delivered] == [["u1"], ["u2"], ["u3"]]
+    assert collection.resumed_after == [None, {"_data": "token-1"}]
+
+
+def test_watcher_restarts_from_now_when_history_is_lost(mongo):
+    async def scenario():
+        await mongo["ChangeStreamTokens"].insert_one({"_id": "tasks", "token": {"_data": "expired"}})
+        manager = FakeManager()
+        collection = FakeCollection(
+            OperationFailure("resume point no longer in the oplog", code=CHANGE_STREAM_HISTORY_LOST),
+            [insert_change("u1")],
+        )
+        watcher = TaskChangeWatcher(manager, collection_factory=lambda: collection)
+        watcher.RECONNECT_DELAY = 0
+        await run_watcher(watcher, lambda: manager.delivered)
+        return collection
+
+    collection = asyncio.run(scenario())
+    assert collection.resumed_after == [{"_data": "expired"}, None]